@@ -11,7 +11,9 @@ from pygments.lexers import get_lexer_by_name
 from pygments.formatters import HtmlFormatter
 import base64
 import json
-import requests
+from utils.search_cache import serper_search
+from utils.single_flight import get_single_flight
+from utils.llm_gateway import get_llm_gateway
 import graphviz
 from markdown import markdown
 
@@ -21,7 +23,8 @@ groq_api_key = os.getenv("GROQ_API_KEY")
 serper_api_key = os.getenv("SERPER_API_KEY")
 
 # Initialize Groq client
-client = groq.Client(api_key=groq_api_key)
+client = groq.Client(api_key=groq_api_key, max_retries=0)  # Retries are handled by the LLM gateway
+CHALLENGE_MODEL = "llama-3.3-70b-versatile"
 
 # Set page config
 st.set_page_config(
@@ -232,7 +235,8 @@ def get_ai_suggestion(code, language, prompt):
             user_message = f"Help me with this {language} code:\n\n```{language}\n{code}\n```"
         
         # Make API call
-        chat_completion = client.chat.completions.create(
+        chat_completion = get_llm_gateway().chat_completion(
+            client,
             model="llama-3.3-70b-versatile",  # Use the Mixtral model which is good for code
             messages=[
                 {"role": "system", "content": system_message},
@@ -311,6 +315,24 @@ def generate_code_flowchart(code, language):
     except Exception as e:
         return None, f"Error generating flowchart: {str(e)}"
 
+def request_challenge_text(system_message, user_message):
+    """Ask the LLM for a challenge and return its raw text; safe to share between sessions"""
+    # Make API call without forcing JSON format to avoid validation errors
+    chat_completion = get_llm_gateway().chat_completion(
+        client,
+        model=CHALLENGE_MODEL,
+        messages=[
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message}
+        ],
+        temperature=0.5,
+        max_tokens=2048
+        # Removed response_format to get raw text instead of validated JSON
+    )
+    
+    # Extract the response
+    return chat_completion.choices[0].message.content
+
 def generate_dsa_challenge(topic, difficulty, company, language):
     """Generate a DSA challenge using Groq LLM"""
     try:
@@ -346,20 +368,11 @@ def generate_dsa_challenge(topic, difficulty, company, language):
         Keep the starter_code concise and use simple string representation.
         """
         
-        # Make API call without forcing JSON format to avoid validation errors
-        chat_completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": f"Create a {difficulty} level {topic} problem for {language} programming language{company_prompt}."}
-            ],
-            temperature=0.5,
-            max_tokens=2048
-            # Removed response_format to get raw text instead of validated JSON
-        )
+        user_message = f"Create a {difficulty} level {topic} problem for {language} programming language{company_prompt}."
         
-        # Extract the response
-        response_text = chat_completion.choices[0].message.content
+        # Sessions asking for the identical challenge at the same moment share a single LLM call
+        flight_key = ("dsa_challenge", CHALLENGE_MODEL, system_message, user_message)
+        response_text = get_single_flight().do(flight_key, request_challenge_text, system_message, user_message)
         
         # Try to extract JSON from the response text
         # Sometimes the model might return additional text before or after the JSON
@@ -422,40 +435,19 @@ def search_similar_problems(topic, company):
         
         query = f"{topic} coding interview problem {company if company != 'Any' else 'tech companies'}"
         
-        payload = {
-            "q": query,
-            "gl": "us",
-            "hl": "en",
-            "num": 5
-        }
+        result = serper_search("search", query, serper_api_key, num=5, gl="us", hl="en")
+        similar_problems = []
         
-        headers = {
-            "X-API-KEY": serper_api_key,
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.post(
-            "https://google.serper.dev/search",
-            json=payload,
-            headers=headers
-        )
+        # Extract organic search results
+        if "organic" in result:
+            for item in result["organic"][:3]:  # Get top 3 results
+                similar_problems.append({
+                    "title": item.get("title", ""),
+                    "link": item.get("link", ""),
+                    "snippet": item.get("snippet", "")
+                })
         
-        if response.status_code == 200:
-            result = response.json()
-            similar_problems = []
-            
-            # Extract organic search results
-            if "organic" in result:
-                for item in result["organic"][:3]:  # Get top 3 results
-                    similar_problems.append({
-                        "title": item.get("title", ""),
-                        "link": item.get("link", ""),
-                        "snippet": item.get("snippet", "")
-                    })
-            
-            return similar_problems
-        else:
-            return f"Error: {response.status_code}"
+        return similar_problems
     except Exception as e:
         return f"Error searching similar problems: {str(e)}"
 
@@ -467,6 +459,8 @@ def main():
     # Sidebar for navigation
     st.sidebar.title("Navigation")
     page = st.sidebar.radio("Go to", ["Code Editor", "DSA Challenges", "About"])
+    flight_stats = get_single_flight().stats()
+    st.sidebar.caption(f"Shared LLM calls: {flight_stats['coalesced']} coalesced, {flight_stats['executed']} executed")
     
     if page == "Code Editor":
         code_editor_page()
@@ -699,7 +693,8 @@ def dsa_challenges_page():
                     # Generate a hint with LLM
                     hint_prompt = f"Provide a helpful hint for solving this DSA problem without giving away the complete solution:\n\n{challenge.get('description')}"
                     
-                    chat_completion = client.chat.completions.create(
+                    chat_completion = get_llm_gateway().chat_completion(
+                        client,
                         model="llama-3.3-70b-versatile",
                         messages=[
                             {"role": "system", "content": "You are a DSA tutor who provides helpful hints without revealing the full solution."},
@@ -722,7 +717,8 @@ def dsa_challenges_page():
                 if not solution_approach:
                     solution_prompt = f"Provide a detailed solution in {language} for this DSA problem with explanation:\n\n{challenge.get('description')}"
                     
-                    chat_completion = client.chat.completions.create(
+                    chat_completion = get_llm_gateway().chat_completion(
+                        client,
                         model="llama-3.3-70b-versatile",
                         messages=[
                             {"role": "system", "content": "You are an expert DSA coach providing optimal solutions with clear explanations."},
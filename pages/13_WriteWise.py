@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 from groq import Groq
+from utils.llm_gateway import get_llm_gateway
 from dotenv import load_dotenv
 import json
 import time
@@ -11,7 +12,8 @@ load_dotenv()
 
 # Initialize Groq client
 client = Groq(
-    api_key=os.environ.get("GROQ_API_KEY")
+    api_key=os.environ.get("GROQ_API_KEY"),
+    max_retries=0  # Retries are handled by the LLM gateway
 )
 
 # Set page configuration
@@ -217,7 +219,8 @@ if st.button("Analyze My Writing", disabled=st.session_state.is_analyzing or not
     
     try:
         # Call the Groq API
-        response = client.chat.completions.create(
+        response = get_llm_gateway().chat_completion(
+            client,
             model=model,
             messages=[
                 {"role": "system", "content": "You are WritingMuse, a creative writing mentor with expertise in narrative analysis."},
@@ -4,8 +4,10 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 import uuid
-import requests
+from utils.search_cache import serper_search
 import json
+from utils.executors import get_io_executor
+from utils.llm_gateway import get_llm_gateway, BATCH
 
 # Page configuration
 st.set_page_config(
@@ -443,7 +445,7 @@ if not groq_api_key:
 if not serper_api_key:
     st.warning("⚠️ SERPER_API_KEY not set. Web search functionality will be limited.")
 
-client = Groq(api_key=groq_api_key)
+client = Groq(api_key=groq_api_key, max_retries=0)  # Retries are handled by the LLM gateway
 
 # Expanded model selection with more Groq models
 MODELS = {
@@ -506,24 +508,8 @@ def search_web(query, num_results=5):
             ]
         }
 
-    headers = {
-        'X-API-KEY': serper_api_key,
-        'Content-Type': 'application/json'
-    }
-
-    payload = {
-        "q": query,
-        "num": num_results
-    }
-
     try:
-        response = requests.post(
-            'https://google.serper.dev/search',
-            headers=headers,
-            json=payload
-        )
-        response.raise_for_status()
-        return response.json()
+        return serper_search("search", query, serper_api_key, num=num_results)
     except Exception as e:
         st.error(f"Search error: {e}")
         return {"organic": []}
@@ -542,8 +528,11 @@ def extract_relevant_info(search_results, query):
 
     return relevant_info
 
-def generate_follow_up_questions(response_text, query):
-    """Generate follow-up questions based on AI response and query"""
+def generate_follow_up_questions(response_text, query, model_name):
+    """Generate follow-up questions based on AI response and query.
+
+    Runs on a worker thread, so the model is passed in rather than read from session state.
+    """
     system_prompt = """
     Given the original query and the AI's response, generate 3 natural follow-up questions that the user might want to ask next.
     Make these questions specific, diverse, and naturally flowing from the current conversation.
@@ -551,9 +540,8 @@ def generate_follow_up_questions(response_text, query):
     """
 
     try:
-        model_name = MODELS[st.session_state[f"{APP_KEY}_model"]]
-
-        follow_up_response = client.chat.completions.create(
+        follow_up_response = get_llm_gateway().chat_completion(
+            client,
             model=model_name,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -561,7 +549,8 @@ def generate_follow_up_questions(response_text, query):
             ],
             temperature=0.7,
             max_tokens=150,
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            priority=BATCH
         )
 
         response_text = follow_up_response.choices[0].message.content.strip()
@@ -777,7 +766,8 @@ When search results are provided, use them to inform your response. Explicitly r
         formatted_messages.extend(conversation_history[-8:])
 
         # Generate the response
-        response = client.chat.completions.create(
+        response = get_llm_gateway().chat_completion(
+            client,
             model=model_name,
             messages=formatted_messages,
             temperature=0.7,
@@ -788,19 +778,20 @@ When search results are provided, use them to inform your response. Explicitly r
 
         bot_response = response.choices[0].message.content.strip() if response.choices else "Error: No response received."
 
-        # Generate follow-up questions
-        follow_up_questions = generate_follow_up_questions(bot_response, user_input)
+        # Start generating follow-up questions while the answer is rendered
+        follow_up_future = get_io_executor().submit(generate_follow_up_questions, bot_response, user_input, model_name)
 
         # Replace the thinking message with the actual response
         current_chat["messages"].pop()  # Remove the thinking message
 
-        current_chat["messages"].append({
+        assistant_message = {
             "role": "assistant",
             "content": bot_response,
             "sources": sources,
-            "follow_up_questions": follow_up_questions,
+            "follow_up_questions": [],
             "avatar": "🔍"
-        })
+        }
+        current_chat["messages"].append(assistant_message)
 
         # Update the display
         thinking_placeholder.empty()
@@ -827,7 +818,9 @@ When search results are provided, use them to inform your response. Explicitly r
                         unsafe_allow_html=True
                     )
 
-            # Display follow-up questions
+            # Display follow-up questions once they are ready
+            follow_up_questions = follow_up_future.result()
+            assistant_message["follow_up_questions"] = follow_up_questions
             if follow_up_questions:
                 st.markdown("---")
                 st.markdown("<div class='followup-container'>", unsafe_allow_html=True)
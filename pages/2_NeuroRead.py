@@ -1,11 +1,20 @@
 import streamlit as st
 from groq import Groq
 import os
+import time
+import heapq
+import re
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
-from pdfminer.high_level import extract_text
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+import scipy.sparse as sp
 import numpy as np
+from utils.pdf_text import create_extraction_executor, PdfExtractionJob
+from utils.pdf_text_cache import content_hash, get_pdf_text_cache
+from utils.tokenizer import encode, decode, count_tokens
+from utils.llm_gateway import get_llm_gateway
 
 # Page configuration
 st.set_page_config(
@@ -126,7 +135,7 @@ if not groq_api_key:
     st.error("❌ GROQ_API_KEY environment variable not set.")
     st.stop()
 
-client = Groq(api_key=groq_api_key)
+client = Groq(api_key=groq_api_key, max_retries=0)  # Retries are handled by the LLM gateway
 
 # Model configuration
 MODELS = {
@@ -134,48 +143,389 @@ MODELS = {
     'Llama3 70b': 'llama3-70b-8192',
 }
 
-# Helper functions (keeping the same implementation)
-def get_pdf_text(pdf_docs):
-    text_content = []
-    for uploaded_file in pdf_docs:
-        if uploaded_file.type == "application/pdf":
-            try:
-                text = extract_text(uploaded_file)
-                text_content.append({
-                    'filename': uploaded_file.name,
-                    'content': text
-                })
-            except Exception as e:
-                st.error(f"Error processing {uploaded_file.name}: {str(e)}")
-    return text_content
+# Retrieval configuration
+CHUNK_TOKENS = 256
+CHUNK_OVERLAP_TOKENS = 48
+HASH_FEATURES = 2 ** 20
+BM25_K1 = 1.5
+BM25_B = 0.75
+TOP_K_CANDIDATES = 40
+# Candidates scoring below this share of the best chunk are not relevant enough to send
+MIN_RELATIVE_SCORE = 0.25
+# Packing stops where the score falls below this share of the previous chunk's
+SCORE_DROP_RATIO = 0.5
+# Bump when chunking or vectorization changes so cached indexes are rebuilt
+INDEX_VERSION = 2
+
+# Token budget for each request; relevant context is packed into what is left
+MODEL_CONTEXT_TOKENS = 8192
+ANSWER_MAX_TOKENS = 1024
+PROMPT_OVERHEAD_TOKENS = 512
+CONTEXT_TOKEN_BUDGET = MODEL_CONTEXT_TOKENS - ANSWER_MAX_TOKENS - PROMPT_OVERHEAD_TOKENS
+EXTRACTION_POLL_SECONDS = 1.0
+
+# Answer cache configuration
+ANSWER_CACHE_MAX_ENTRIES = 2000
+ANSWER_CACHE_TTL_SECONDS = 24 * 60 * 60
+ANSWER_CACHE_SIMILARITY = 0.9
+# Share of their top-ranked chunks two questions must have in common to reuse an answer
+ANSWER_CACHE_MIN_CHUNK_OVERLAP = 0.8
+ANSWER_CACHE_COMPARED_CHUNKS = 5
+# Words after which a letter or roman numeral names a specific part of the document
+IDENTIFIER_PREFIXES = r'chapter|section|part|unit|theorem|lemma|definition|figure|fig\.?|table|appendix|exercise|problem|step'
+SCORERS = {
+    'TF-IDF': 'tfidf',
+    'BM25': 'bm25',
+}
 
+# Helper functions
 @st.cache_resource
-def create_tfidf_vectorizer():
-    return TfidfVectorizer()
+def get_extraction_executor():
+    """Process pool shared by every session for PDF text extraction"""
+    return create_extraction_executor()
+
+def start_pdf_extraction(pdf_docs):
+    """Start extracting uploaded PDFs in the background, one page range per worker task"""
+    uploads = [
+        (uploaded_file.name, get_file_hash(uploaded_file), uploaded_file.getvalue())
+        for uploaded_file in pdf_docs
+        if uploaded_file.type == "application/pdf"
+    ]
+    return PdfExtractionJob(get_extraction_executor(), uploads, cache=get_pdf_text_cache())
+
+def report_extraction_progress(placeholder, pages_done, pages_total, pages_per_second):
+    placeholder.progress(
+        pages_done / pages_total if pages_total else 0.0,
+        text=f"Processing documents... {pages_done}/{pages_total} pages ({pages_per_second:.1f} pages/s). "
+             "You can already ask about processed pages."
+    )
+
+def get_file_hash(uploaded_file):
+    """Content hash of an uploaded file, used to key its index and extracted text"""
+    # The page reruns every second during extraction; hash each upload only once
+    file_hashes = st.session_state.setdefault("file_hashes", {})
+    if uploaded_file.file_id not in file_hashes:
+        file_hashes[uploaded_file.file_id] = content_hash(uploaded_file.getvalue())
+    return file_hashes[uploaded_file.file_id]
 
-def get_relevant_chunks(text, user_question, vectorizer, top_n=2):
-    chunk_size = 10000
-    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+@st.cache_resource
+def create_hashing_vectorizer():
+    """Stateless vectorizer, safe to share because it is never fitted"""
+    # Without stop words, every chunk containing "what" or "is" would match every question
+    return HashingVectorizer(n_features=HASH_FEATURES, alternate_sign=False, norm=None, stop_words='english')
 
-    if not chunks:
-        return []
+@st.cache_resource
+def create_question_vectorizer():
+    """Vectorizer for matching cached questions: keeps one-character tokens such as "4" and adds bigrams"""
+    return HashingVectorizer(
+        n_features=HASH_FEATURES, alternate_sign=False, norm='l2',
+        token_pattern=r"(?u)\b\w+\b", ngram_range=(1, 2)
+    )
+
+class ChunkIndex:
+    """Sparse TF-IDF and BM25 matrices over a set of chunks"""
+
+    def __init__(self, chunks, counts):
+        self.chunks = chunks
+        self.counts = counts.tocsr()
+        n_chunks = self.counts.shape[0]
+
+        # Document frequency of every term that occurs in the chunks
+        self.terms, df = np.unique(self.counts.indices, return_counts=True)
+        term_positions = np.searchsorted(self.terms, self.counts.indices)
+        tf = self.counts.data.astype(np.float64)
+
+        # Smoothed TF-IDF, L2-normalized so a dot product is a cosine similarity
+        self.tfidf_idf = np.log((1 + n_chunks) / (1 + df)) + 1
+        self.tfidf = self.counts.astype(np.float64)
+        self.tfidf.data = tf * self.tfidf_idf[term_positions]
+        self.tfidf = normalize(self.tfidf)
+
+        # Okapi BM25 with the length normalization folded into the matrix
+        self.bm25_idf = np.log((n_chunks - df + 0.5) / (df + 0.5) + 1)
+        lengths = np.asarray(self.counts.sum(axis=1)).ravel()
+        avg_length = max(lengths.mean(), 1.0) if n_chunks else 1.0
+        row_lengths = np.repeat(lengths, np.diff(self.counts.indptr))
+        self.bm25 = self.counts.astype(np.float64)
+        self.bm25.data = self.bm25_idf[term_positions] * tf * (BM25_K1 + 1) / (
+            tf + BM25_K1 * (1 - BM25_B + BM25_B * row_lengths / avg_length)
+        )
+
+    def _query_vector(self, query_counts, idf=None):
+        """Restrict the question's terms to those in the document, optionally IDF-weighted"""
+        query_counts = query_counts.tocsr()
+        if not len(self.terms) or not query_counts.nnz:
+            return None
+
+        positions = np.minimum(np.searchsorted(self.terms, query_counts.indices), len(self.terms) - 1)
+        known = self.terms[positions] == query_counts.indices
+        if not known.any():
+            return None
+
+        if idf is None:
+            data = np.ones(known.sum())
+        else:
+            data = query_counts.data[known] * idf[positions[known]]
+        return sp.csr_matrix(
+            (data, query_counts.indices[known], [0, known.sum()]),
+            shape=(1, self.counts.shape[1])
+        )
 
-    chunk_vectors = vectorizer.fit_transform(chunks)
-    question_vector = vectorizer.transform([user_question])
-    similarities = cosine_similarity(question_vector, chunk_vectors).flatten()
+    def tfidf_vector(self, query_counts):
+        """L2-normalized TF-IDF vector of a question, or None if it shares no terms with the chunks"""
+        query_vector = self._query_vector(query_counts, self.tfidf_idf)
+        return normalize(query_vector) if query_vector is not None else None
+
+    def score(self, query_counts, scorer='tfidf'):
+        """Score every chunk against a vectorized question with one sparse product"""
+        if scorer == 'bm25':
+            query_vector = self._query_vector(query_counts)
+            matrix = self.bm25
+        else:
+            query_vector = self.tfidf_vector(query_counts)
+            matrix = self.tfidf
+
+        if query_vector is None:
+            return np.zeros(self.counts.shape[0])
+        return (matrix @ query_vector.T).toarray().ravel()
+
+def split_into_units(text, max_tokens):
+    """Split text into paragraphs, falling back to sentences and then raw tokens when too long"""
+    units = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = ' '.join(paragraph.split())
+        if not paragraph:
+            continue
+        paragraph_tokens = count_tokens(paragraph)
+        if paragraph_tokens <= max_tokens:
+            units.append((paragraph, paragraph_tokens))
+            continue
+
+        for sentence in re.split(r'(?<=[.!?])\s+', paragraph):
+            sentence_tokens = encode(sentence)
+            if len(sentence_tokens) <= max_tokens:
+                units.append((sentence, len(sentence_tokens)))
+                continue
+            for i in range(0, len(sentence_tokens), max_tokens):
+                piece = sentence_tokens[i:i + max_tokens]
+                units.append((decode(piece), len(piece)))
+    return units
+
+def split_overlap(units, max_tokens):
+    """Trailing sentences of a chunk up to max_tokens, or the last tokens of a longer final sentence"""
+    overlap = []
+    overlap_tokens = 0
+    if max_tokens <= 0:
+        return overlap
+    for text, _ in reversed(units):
+        for sentence in reversed(re.split(r'(?<=[.!?])\s+', text)):
+            sentence_tokens = count_tokens(sentence)
+            if overlap_tokens + sentence_tokens > max_tokens:
+                if not overlap:
+                    tail = encode(sentence)[-max_tokens:]
+                    overlap.append((decode(tail), len(tail)))
+                return overlap
+            overlap.insert(0, (sentence, sentence_tokens))
+            overlap_tokens += sentence_tokens
+    return overlap
+
+def split_into_chunks(pages, chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """Pack paragraphs and sentences into token-bounded chunks that never cross a page break"""
+    chunks = []
+    for page_number in sorted(pages):
+        current = []
+        current_tokens = 0
+        for unit in split_into_units(pages[page_number], chunk_tokens):
+            if current and current_tokens + unit[1] > chunk_tokens:
+                chunks.append({'page': page_number, 'text': ' '.join(text for text, _ in current), 'tokens': current_tokens})
+
+                # Carry the last sentences of the chunk into the next one as overlap
+                current = split_overlap(current, min(overlap_tokens, chunk_tokens - unit[1]))
+                current_tokens = sum(tokens for _, tokens in current)
+
+            current.append(unit)
+            current_tokens += unit[1]
+
+        if current:
+            chunks.append({'page': page_number, 'text': ' '.join(text for text, _ in current), 'tokens': current_tokens})
+    return chunks
+
+def vectorize_pages(pages):
+    chunks = split_into_chunks(pages)
+    counts = create_hashing_vectorizer().transform([chunk['text'] for chunk in chunks])
+    return chunks, counts
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def vectorize_document(doc_hash, index_version, _pages):
+    """Chunk and vectorize a fully extracted document once, keyed by its content hash and the index version"""
+    return vectorize_pages(_pages)
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def build_corpus_index(doc_keys, _processed_docs):
+    """Stack every document's chunk vectors into one index, keyed by the uploads and their progress"""
+    chunks = []
+    counts = []
+    for doc in _processed_docs:
+        if not doc['pages']:
+            continue
+        if len(doc['pages']) == doc['page_count']:
+            doc_chunks, doc_counts = vectorize_document(doc['hash'], INDEX_VERSION, doc['pages'])
+        else:
+            # Still extracting: index the pages that are ready so far
+            doc_chunks, doc_counts = vectorize_pages(dict(doc['pages']))
+        chunks.extend(
+            dict(chunk, filename=doc['filename'], chunk_id=f"{doc['hash']}:{i}")
+            for i, chunk in enumerate(doc_chunks)
+        )
+        counts.append(doc_counts)
 
-    if np.all(similarities == 0):
+    if not chunks:
+        return None
+    return ChunkIndex(chunks, sp.vstack(counts, format='csr'))
+
+def get_corpus_index(processed_docs):
+    # Sessions extracting the same file can hold different page ranges, so partial documents are keyed
+    # by the exact pages they have
+    doc_keys = (INDEX_VERSION,) + tuple(
+        (doc['hash'], doc['filename'],
+         len(doc['pages']) if len(doc['pages']) == doc['page_count'] else tuple(sorted(doc['pages'])))
+        for doc in processed_docs
+    )
+    return build_corpus_index(doc_keys, processed_docs)
+
+def get_relevant_chunks(corpus_index, user_question, vectorizer, top_n=TOP_K_CANDIDATES, scorer='tfidf'):
+    """Return the global top-n chunks across all documents with their filename and page, dropping weak matches"""
+    if corpus_index is None:
         return []
 
-    top_indices = np.argsort(similarities)[::-1][:top_n]
-    return [chunks[i] for i in top_indices]
+    query_counts = vectorizer.transform([user_question])
+    similarities = corpus_index.score(query_counts, scorer)
 
-def truncate_text(text, max_tokens=6000):
-    tokens = text.split()
-    return ' '.join(tokens[:max_tokens]) if len(tokens) > max_tokens else text
+    if not len(similarities) or similarities.max() <= 0:
+        return []
+    candidates = np.flatnonzero(similarities >= MIN_RELATIVE_SCORE * similarities.max())
+
+    top_indices = heapq.nlargest(top_n, candidates, key=similarities.__getitem__)
+    return [dict(corpus_index.chunks[i], score=float(similarities[i])) for i in top_indices]
+
+def format_chunk(chunk):
+    return f"[{chunk['filename']}, page {chunk['page']}]\n{chunk['text']}"
+
+def pack_context(chunks, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Greedily add the highest-scoring chunks until the budget is spent or the scores fall off"""
+    packed = []
+    used_tokens = 0
+    for chunk in chunks:
+        if packed and chunk['score'] < packed[-1]['score'] * SCORE_DROP_RATIO:
+            break
+        chunk_tokens = count_tokens(format_chunk(chunk))
+        if used_tokens + chunk_tokens > token_budget:
+            continue
+        packed.append(chunk)
+        used_tokens += chunk_tokens
+    return packed
+
+def format_context(chunks):
+    return "\n\n".join(format_chunk(chunk) for chunk in chunks)
+
+def format_sources(chunks):
+    sources = dict.fromkeys((chunk['filename'], chunk['page']) for chunk in chunks)
+    return ", ".join(f"{filename} (p. {page})" for filename, page in sources)
+
+class AnswerCache:
+    """Process-wide LRU cache of answers with a TTL and optional near-duplicate question matching"""
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl_seconds=ANSWER_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, entry):
+        return time.time() - entry['created_at'] < self.ttl_seconds
+
+    @staticmethod
+    def _chunk_overlap(a, b):
+        return len(a & b) / len(a | b) if a or b else 1.0
+
+    def get(self, key, scope, question_vector=None, threshold=None, chunk_ids=()):
+        """Look up an exact key, then the most similar question asked of the same documents and model
+        that retrieved (nearly) the same chunks"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+
+            if question_vector is not None and threshold:
+                best_key, best_similarity = None, threshold
+                for candidate_key, candidate in self._entries.items():
+                    if candidate['scope'] != scope or candidate['vector'] is None or not self._is_fresh(candidate):
+                        continue
+                    if self._chunk_overlap(candidate['chunk_ids'], frozenset(chunk_ids)) < ANSWER_CACHE_MIN_CHUNK_OVERLAP:
+                        continue
+                    similarity = (candidate['vector'] @ question_vector.T).toarray()[0, 0]
+                    if similarity >= best_similarity:
+                        best_key, best_similarity = candidate_key, similarity
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.near_hits += 1
+                    return self._entries[best_key]
+
+            self.misses += 1
+            return None
+
+    def set(self, key, scope, answer, sources, question_vector=None, chunk_ids=()):
+        with self._lock:
+            self._entries[key] = {
+                'scope': scope,
+                'chunk_ids': frozenset(chunk_ids),
+                'answer': answer,
+                'sources': sources,
+                'vector': question_vector,
+                'created_at': time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            'hits': self.hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses,
+            'hit_ratio': (self.hits + self.near_hits) / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+        }
 
-def get_answer(user_question, context, file_names):
-    context = truncate_text(context)
+@st.cache_resource
+def get_answer_cache():
+    """Answer cache shared by every session in this process"""
+    return AnswerCache()
+
+def normalize_question(question):
+    return re.sub(r'\s+', ' ', question.lower()).strip().rstrip('?.! ')
+
+def question_identifiers(question):
+    """Numbers and lettered references such as "theorem B" or "part II", which must match exactly"""
+    numbers = re.findall(r'\b\d+(?:\.\d+)*\b', question)
+    letters = re.findall(rf'\b(?:{IDENTIFIER_PREFIXES})\s+([a-z]|[ivx]+)\b', question, re.IGNORECASE)
+    return tuple(sorted(set(numbers + [letter.upper() for letter in letters])))
+
+def get_answer_cache_key(processed_docs, model, user_question, chunks):
+    # Near-duplicate matching only happens within a scope, so identifiers are part of it
+    scope = (tuple(sorted(doc['hash'] for doc in processed_docs)), model, question_identifiers(user_question))
+    key = (scope, normalize_question(user_question), tuple(chunk['chunk_id'] for chunk in chunks))
+    return key, scope
+
+def build_answer_messages(user_question, context, file_names):
     prompt = f"""
     Based on the following documents: {', '.join(file_names)}
 
@@ -186,23 +536,48 @@ def get_answer(user_question, context, file_names):
     Please provide a clear and concise answer based on the context provided.
     If the answer cannot be found in the context, please say so.
     """
+    return [
+        {"role": "system", "content": "You are a helpful document analysis assistant. Provide accurate answers based on the given context."},
+        {"role": "user", "content": prompt}
+    ]
 
-    try:
-        completion = client.chat.completions.create(
-            model=MODELS['Llama3 8b'],
-            messages=[
-                {"role": "system", "content": "You are a helpful document analysis assistant. Provide accurate answers based on the given context."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1024,
-            top_p=1,
-            stream=False,
-        )
-        return completion.choices[0].message.content.strip()
-    except Exception as e:
-        return f"Error generating answer: {str(e)}"
-
+def get_answer(user_question, context, file_names):
+    completion = get_llm_gateway().chat_completion(
+        client,
+        model=MODELS['Llama3 8b'],
+        messages=build_answer_messages(user_question, context, file_names),
+        temperature=0.7,
+        max_tokens=ANSWER_MAX_TOKENS,
+        top_p=1,
+        stream=False,
+    )
+    return completion.choices[0].message.content.strip()
+
+def stream_answer(user_question, context, file_names):
+    """Yield the answer piece by piece as the model generates it; errors, even mid-stream, are raised"""
+    completion = get_llm_gateway().chat_completion(
+        client,
+        model=MODELS['Llama3 8b'],
+        messages=build_answer_messages(user_question, context, file_names),
+        temperature=0.7,
+        max_tokens=ANSWER_MAX_TOKENS,
+        top_p=1,
+        stream=True,
+    )
+    for chunk in completion:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+
+def render_message(message, placeholder=None):
+    role_class, header = ("user-message", "You") if message["role"] == "user" else ("assistant-message", "Assistant")
+    html = f"""
+        <div class="chat-message {role_class}">
+            <div class="message-header">{header}</div>
+            {message['content']}
+        </div>
+    """
+    (placeholder or st).markdown(html, unsafe_allow_html=True)
 
 def main():
     # Improved header with a more prominent title
@@ -213,7 +588,7 @@ def main():
     with st.expander("ℹ️ How to use this app"):
         st.markdown("""
             1.  **Upload Documents:** Use the sidebar to upload one or more PDF documents.
-            2.  **Wait for Processing:**  The documents will be processed automatically. Please wait for the confirmation message.
+            2.  **Wait for Processing:**  The documents are processed in the background. You can ask questions as soon as the first pages are ready.
             3.  **Ask Questions:** Type your question in the input box below and click the "Ask" button.
             4.  **Get Answers:**  The AI will analyze your documents and provide an answer.
 
@@ -225,6 +600,8 @@ def main():
         st.session_state.doc_reader_messages = []
     if "processed_docs" not in st.session_state:
         st.session_state.processed_docs = None
+    if "extraction_job" not in st.session_state:
+        st.session_state.extraction_job = None
 
     # Sidebar for file upload
     with st.sidebar:
@@ -240,20 +617,61 @@ def main():
             for file in uploaded_files:
                 st.markdown(f'<div class="uploadedFile">📎 {file.name}</div>', unsafe_allow_html=True)
 
+        st.subheader("⚙️ Retrieval")
+        scorer_name = st.radio(
+            "Ranking method",
+            options=list(SCORERS.keys()),
+            horizontal=True,
+            help="TF-IDF ranks by cosine similarity; BM25 favours rarer question terms and dampens repeated ones."
+        )
+
+        stream_answers = st.toggle("Stream answers", value=True, help="Show the answer as it is generated")
+
+        use_answer_cache = st.toggle("Reuse cached answers", value=True, help="Answer repeated questions about the same documents instantly")
+        match_similar_questions = st.checkbox(
+            "Match similar questions",
+            value=True,
+            disabled=not use_answer_cache,
+            help=f"Reuse an answer when a question's similarity to a cached one is at least {ANSWER_CACHE_SIMILARITY} and it draws on the same passages"
+        )
+
+        answer_stats = get_answer_cache().stats()
+        st.caption(
+            f"Answer cache: {answer_stats['hits']} hits, {answer_stats['near_hits']} similar, "
+            f"{answer_stats['misses']} misses ({answer_stats['hit_ratio']:.0%} hit ratio)"
+        )
+
+        cache_stats = get_pdf_text_cache().stats()
+        st.caption(
+            f"Extraction cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+            f"{cache_stats['entries']} documents ({cache_stats['bytes'] / 1024 / 1024:.1f} MB)"
+        )
+
     # Main content area
     if uploaded_files:
-        if not st.session_state.processed_docs:
-            with st.status("Processing documents...", expanded=True) as status:
-                try:
-                    st.session_state.processed_docs = get_pdf_text(uploaded_files)
-                    if st.session_state.processed_docs:
-                        status.update(label="✅ Documents processed", state="complete")
-                    else:
-                        status.update(label="❌ Processing failed", state="error")
-                        st.stop()
-                except Exception as e:
-                    status.update(label=f"❌ Processing failed: {e}", state="error")
-                    st.stop()
+        upload_hashes = tuple(get_file_hash(file) for file in uploaded_files if file.type == "application/pdf")
+        job = st.session_state.extraction_job
+        if job is None or tuple(doc['hash'] for doc in job.documents) != upload_hashes:
+            if job is not None:
+                job.cancel()
+            job = start_pdf_extraction(uploaded_files)
+            st.session_state.extraction_job = job
+            st.session_state.processed_docs = job.documents
+
+        # Pull in any pages finished since the last run
+        progress_placeholder = st.empty()
+        job.collect(lambda done, total, rate: report_extraction_progress(progress_placeholder, done, total, rate))
+
+        for doc in st.session_state.processed_docs:
+            if doc['error']:
+                st.error(f"Error processing {doc['filename']}: {doc['error']}")
+
+        if job.done:
+            if job.pages_done:
+                progress_placeholder.markdown('<div class="success-message">✅ Documents processed</div>', unsafe_allow_html=True)
+            else:
+                progress_placeholder.error("❌ Processing failed")
+                st.stop()
 
         # Question input in a styled container
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
@@ -264,37 +682,85 @@ def main():
         st.markdown('</div>', unsafe_allow_html=True)
 
         if user_question and ask_button:
+            answer_cache = get_answer_cache()
+            cached_answer = None
+            answer_failed = False
             with st.spinner("Analyzing..."):
-                all_text = " ".join([doc['content'] for doc in st.session_state.processed_docs])
-                vectorizer = create_tfidf_vectorizer()
-                relevant_chunks = get_relevant_chunks(all_text, user_question, vectorizer)
-                context = "\n".join(relevant_chunks)
-
+                corpus_index = get_corpus_index(st.session_state.processed_docs)
+                vectorizer = create_hashing_vectorizer()
+                relevant_chunks = pack_context(get_relevant_chunks(
+                    corpus_index, user_question, vectorizer, scorer=SCORERS[scorer_name]
+                ))
+                context = format_context(relevant_chunks)
                 file_names = [doc['filename'] for doc in st.session_state.processed_docs]
-                answer = get_answer(user_question, context, file_names)
 
-                # Add new messages to the beginning of the list to reverse the order
-                st.session_state.doc_reader_messages.insert(0, {"role": "user", "content": user_question})
-                st.session_state.doc_reader_messages.insert(0, {"role": "assistant", "content": answer})
+                # Only fully extracted documents are cached, so partial answers are never reused
+                cacheable = use_answer_cache and job.done
+                if cacheable:
+                    cache_key, cache_scope = get_answer_cache_key(
+                        st.session_state.processed_docs, MODELS['Llama3 8b'], user_question, relevant_chunks
+                    )
+                    # The whole question is compared, including terms the documents never use
+                    question_vector = create_question_vectorizer().transform([user_question])
+                    # Only the best matches say what a question is about; the tail varies with wording
+                    chunk_ids = [chunk['chunk_id'] for chunk in relevant_chunks[:ANSWER_CACHE_COMPARED_CHUNKS]]
+                    cached_answer = answer_cache.get(
+                        cache_key, cache_scope, question_vector,
+                        ANSWER_CACHE_SIMILARITY if match_similar_questions else None,
+                        chunk_ids
+                    )
+
+                if cached_answer is None and not stream_answers:
+                    try:
+                        answer = get_answer(user_question, context, file_names)
+                    except Exception as e:
+                        answer = f"Error generating answer: {str(e)}"
+                        answer_failed = True
+
+            if cached_answer is not None:
+                answer = cached_answer['answer']
+                sources = cached_answer['sources']
+            else:
+                if stream_answers:
+                    # Render tokens as they arrive; the final answer is stored below as usual
+                    stream_placeholder = st.empty()
+                    with stream_placeholder.container():
+                        render_message({"role": "user", "content": user_question})
+                        answer_placeholder = st.empty()
+                    answer = ""
+                    try:
+                        for delta in stream_answer(user_question, context, file_names):
+                            answer += delta
+                            render_message({"role": "assistant", "content": answer + "▌"}, answer_placeholder)
+                    except Exception as e:
+                        # Keep what was already shown, but never cache a broken answer
+                        answer += f"\n\nError generating answer: {str(e)}"
+                        answer_failed = True
+                    answer = answer.strip()
+                    stream_placeholder.empty()
+
+                sources = format_sources(relevant_chunks)
+                if cacheable and not answer_failed:
+                    answer_cache.set(cache_key, cache_scope, answer, sources, question_vector, chunk_ids)
+
+            # Add new messages to the beginning of the list to reverse the order
+            st.session_state.doc_reader_messages.insert(0, {"role": "user", "content": user_question})
+            st.session_state.doc_reader_messages.insert(0, {
+                "role": "assistant",
+                "content": answer,
+                "sources": sources,
+                "from_cache": cached_answer is not None
+            })
 
         # Conversation display
         if st.session_state.doc_reader_messages:
             st.markdown("### Conversation")
             for message in st.session_state.doc_reader_messages:
-                if message["role"] == "user":
-                    st.markdown(f"""
-                        <div class="chat-message user-message">
-                            <div class="message-header">You</div>
-                            {message['content']}
-                        </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                        <div class="chat-message assistant-message">
-                            <div class="message-header">Assistant</div>
-                            {message['content']}
-                        </div>
-                    """, unsafe_allow_html=True)
+                render_message(message)
+                if message.get("sources"):
+                    st.caption(f"📄 Sources: {message['sources']}")
+                if message.get("from_cache"):
+                    st.caption("⚡ Answered from cache")
 
             # Clear chat button
             col1, col2, col3 = st.columns([3, 1, 3])
@@ -302,6 +768,11 @@ def main():
                 if st.button("Clear Chat", use_container_width=True):
                     st.session_state.doc_reader_messages = []
                     st.experimental_rerun()
+
+        # Keep polling until every page has been extracted
+        if not job.done:
+            time.sleep(EXTRACTION_POLL_SECONDS)
+            st.rerun()
     else:
         # Welcome message with more emphasis
         st.markdown("""
@@ -2,8 +2,18 @@ import streamlit as st
 import os
 import time
 from groq import Groq
+from utils.llm_gateway import get_llm_gateway, BATCH
 from dotenv import load_dotenv
-import threading
+import streamlit.components.v1 as components
+import json
+import math
+import re
+from collections import Counter
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+import hashlib
+from concurrent.futures import wait, FIRST_COMPLETED, as_completed
+from utils.executors import get_io_executor
+from utils.lru_cache import LRUCache
 
 # Load environment variables
 load_dotenv()
@@ -15,7 +25,46 @@ if not groq_api_key:
     st.stop()
 
 # Initialize Groq client
-client = Groq(api_key=groq_api_key)
+client = Groq(api_key=groq_api_key, max_retries=0)  # Retries are handled by the LLM gateway
+
+# Concurrent question requests per quiz; the LLM gateway still enforces provider rate limits
+QUIZ_GENERATION_WORKERS = 6
+MAX_QUESTION_ATTEMPTS = 5
+# Questions of one type requested per JSON call in batch mode
+QUESTION_BATCH_SIZE = 5
+QUESTION_BATCH_TOKENS_PER_ITEM = 400
+# Questions at least this similar to an accepted one are regenerated
+DUPLICATE_SIMILARITY_THRESHOLD = 0.7
+# Concepts listed in prompts to steer away from already covered material
+COVERAGE_MAX_TERMS = 12
+# Terms in more than this share of the questions are the quiz's theme, not a covered concept
+COVERAGE_GENERIC_SHARE = 0.5
+# Question phrasing that says nothing about the concept being tested
+QUESTION_PHRASING_WORDS = frozenset({
+    "according", "answer", "best", "calculate", "correct", "define", "describe", "discuss", "does",
+    "example", "explain", "false", "following", "given", "identify", "main", "statement", "true",
+})
+
+GRADING_MODEL = "mistral-saba-24b"
+GRADE_CACHE_MAX_ENTRIES = 5000
+GRADE_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Slack for the browser countdown's submit click and network latency; later submissions are marked late
+TIMER_GRACE_SECONDS = 5
+
+QUESTION_JSON_FORMATS = {
+    "mcq": '{"question": "...", "options": {"A": "...", "B": "...", "C": "...", "D": "..."}, "correct_answer": "A|B|C|D"}',
+    "true_false": '{"question": "A statement that is either true or false", "correct_answer": true, "explanation": "..."}',
+    "fill_blank": '{"question": "A sentence with _____ marking the blank", "correct_answer": "..."}',
+    "subjective": '{"question": "...", "ideal_answer": "A comprehensive ideal answer used for grading", "key_points": ["3-5 key points"]}',
+}
+
+QUESTION_TYPE_NAMES = {
+    "mcq": "multiple-choice",
+    "true_false": "true/false",
+    "fill_blank": "fill-in-the-blank",
+    "subjective": "subjective (open-ended)",
+}
 
 # CSS styles for the application
 st.markdown("""
@@ -36,16 +85,6 @@ st.markdown("""
         box-shadow: 0 4px 15px rgba(0,0,0,0.1);
     }
 
-    /* Timer Styles */
-    .timer-display {
-        font-size: 1.5rem;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .timer-warning {
-        color: red;
-    }
-
     /* Question Card Styles */
     .question-card {
         background: white;
@@ -85,6 +124,13 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+# Grades are shared by every session, so regrading an identical answer is instant
+@st.cache_resource
+def get_grade_cache():
+    return LRUCache(GRADE_CACHE_MAX_ENTRIES, ttl_seconds=GRADE_CACHE_TTL_SECONDS)
+
+grade_cache = get_grade_cache()
+
 # Initialize session state variables
 if "quiz_data" not in st.session_state:
     st.session_state.quiz_data = []
@@ -94,159 +140,418 @@ if "quiz_generated" not in st.session_state:
     st.session_state.quiz_generated = False
 if "quiz_submitted" not in st.session_state:
     st.session_state.quiz_submitted = False
-if "time_left" not in st.session_state:
-    st.session_state.time_left = 0
-if "timer_running" not in st.session_state:
-    st.session_state.timer_running = False
+if "quiz_deadline" not in st.session_state:
+    st.session_state.quiz_deadline = None
 if "quiz_type" not in st.session_state:
     st.session_state.quiz_type = "mixed"
 if "auto_submitted" not in st.session_state:
     st.session_state.auto_submitted = False
-if "timer_stop" not in st.session_state:
-    st.session_state.timer_stop = False
+if "submission_delay" not in st.session_state:
+    st.session_state.submission_delay = 0
+if "subjective_grades" not in st.session_state:
+    st.session_state.subjective_grades = {}
+
+def generate_question(subject, topic, question_type, difficulty, description, question_marks=None, slot=1, slot_count=1, coverage=""):
+    """Generate one question with a single LLM call.
+
+    Runs on a worker thread, so it raises on API errors and returns None for unparseable output
+    instead of calling Streamlit. Uniqueness is checked by the caller once results arrive.
+    """
+    # Include test description in the prompt for better context
+    description_context = f"""
+    Additional context about the test:
+    {description}
+    
+    Use this information to generate a more relevant and targeted question.
+    """
 
-def generate_question(subject, topic, question_type, difficulty, description, existing_questions, question_marks=None):
-    max_attempts = 5
-    attempt = 0
+    # Questions are generated concurrently, so steer each one towards a different angle
+    variety_context = f"This is question {slot} of {slot_count} of this type; choose a distinct concept or angle for it."
+    if coverage:
+        variety_context += f"\n        Concepts already covered by other questions (avoid them): {coverage}"
 
-    while attempt < max_attempts:
-        prompt = ""
+    if question_type == "mcq":
+        prompt = f"""
+        Generate a unique multiple-choice quiz question about {topic} in {subject} with {difficulty} difficulty.
+        {variety_context}
+        
+        {description_context}
+
+        Format the quiz exactly as follows:
+        Question: [The question]
+        A: [Option A]
+        B: [Option B]
+        C: [Option C]
+        D: [Option D]
+        Correct Answer: [Single letter A, B, C, or D indicating the correct option]
+        """
+    elif question_type == "true_false":
+        prompt = f"""
+        Generate a unique true/false question about {topic} in {subject} with {difficulty} difficulty.
+        {variety_context}
+        
+        {description_context}
 
-        # Include test description in the prompt for better context
-        description_context = f"""
-        Additional context about the test:
-        {description}
+        Format the quiz exactly as follows:
+        Question: [The statement that is either true or false]
+        Correct Answer: [True or False]
+        Explanation: [Brief explanation of why the statement is true or false]
+        """
+    elif question_type == "fill_blank":
+        prompt = f"""
+        Generate a unique fill-in-the-blank question about {topic} in {subject} with {difficulty} difficulty.
+        {variety_context}
         
-        Use this information to generate a more relevant and targeted question.
+        {description_context}
+
+        Format the quiz exactly as follows:
+        Question: [The sentence with _____ indicating the blank to be filled]
+        Correct Answer: [The word or phrase that correctly fills the blank]
         """
+    else:  # subjective
+        marks_text = f" worth {question_marks} marks" if question_marks else ""
+        prompt = f"""
+        Generate a unique subjective (open-ended) quiz question about {topic} in {subject} with {difficulty} difficulty{marks_text}.
+        {variety_context}
+        
+        {description_context}
 
-        if question_type == "mcq":
-            prompt = f"""
-            Generate a unique multiple-choice quiz question about {topic} in {subject} with {difficulty} difficulty.
-            Ensure the question is different from the following list:
-            {', '.join([q['question'] for q in existing_questions]) if existing_questions else 'None'}
-            
-            {description_context}
-
-            Format the quiz exactly as follows:
-            Question: [The question]
-            A: [Option A]
-            B: [Option B]
-            C: [Option C]
-            D: [Option D]
-            Correct Answer: [Single letter A, B, C, or D indicating the correct option]
-            """
-        elif question_type == "true_false":
-            prompt = f"""
-            Generate a unique true/false question about {topic} in {subject} with {difficulty} difficulty.
-            Ensure the question is different from the following list:
-            {', '.join([q['question'] for q in existing_questions]) if existing_questions else 'None'}
-            
-            {description_context}
-
-            Format the quiz exactly as follows:
-            Question: [The statement that is either true or false]
-            Correct Answer: [True or False]
-            Explanation: [Brief explanation of why the statement is true or false]
-            """
-        elif question_type == "fill_blank":
-            prompt = f"""
-            Generate a unique fill-in-the-blank question about {topic} in {subject} with {difficulty} difficulty.
-            Ensure the question is different from the following list:
-            {', '.join([q['question'] for q in existing_questions]) if existing_questions else 'None'}
-            
-            {description_context}
-
-            Format the quiz exactly as follows:
-            Question: [The sentence with _____ indicating the blank to be filled]
-            Correct Answer: [The word or phrase that correctly fills the blank]
-            """
-        else:  # subjective
-            marks_text = f" worth {question_marks} marks" if question_marks else ""
-            prompt = f"""
-            Generate a unique subjective (open-ended) quiz question about {topic} in {subject} with {difficulty} difficulty{marks_text}.
-            Ensure the question is different from the following list:
-            {', '.join([q['question'] for q in existing_questions]) if existing_questions else 'None'}
-            
-            {description_context}
-
-            Format the quiz exactly as follows:
-            Question: [The question]
-            Ideal Answer: [A comprehensive ideal answer that will be used for grading]
-            Key Points: [List 3-5 key points that should be included in a good answer]
-            """
-
-        try:
-            completion = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "You are an expert educational quiz generator."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500,
-            )
-
-            quiz_text = completion.choices[0].message.content
-
-            if question_type == "mcq":
-                question, options, correct_answer = parse_mcq_question(quiz_text)
-
-                if question and question not in [q["question"] for q in existing_questions]:
-                    return {
-                        "type": "mcq",
-                        "question": question,
-                        "options": options,
-                        "correct_answer": correct_answer,
-                        "difficulty": difficulty,
-                        "marks": 1  # Each MCQ is worth 1 mark
-                    }
-            elif question_type == "true_false":
-                question, correct_answer, explanation = parse_true_false_question(quiz_text)
-
-                if question and question not in [q["question"] for q in existing_questions]:
-                    return {
-                        "type": "true_false",
-                        "question": question,
-                        "correct_answer": correct_answer,
-                        "explanation": explanation,
-                        "difficulty": difficulty,
-                        "marks": 1  # Each True/False is worth 1 mark
-                    }
-            elif question_type == "fill_blank":
-                question, correct_answer = parse_fill_blank_question(quiz_text)
-
-                if question and question not in [q["question"] for q in existing_questions]:
-                    return {
-                        "type": "fill_blank",
-                        "question": question,
-                        "correct_answer": correct_answer,
-                        "difficulty": difficulty,
-                        "marks": 1  # Each Fill in the blank is worth 1 mark
-                    }
-            else:
-                question, ideal_answer, key_points = parse_subjective_question(quiz_text)
-
-                if question and question not in [q["question"] for q in existing_questions]:
-                    return {
-                        "type": "subjective",
-                        "question": question,
-                        "ideal_answer": ideal_answer,
-                        "key_points": key_points,
-                        "difficulty": difficulty,
-                        "marks": question_marks or 5  # Default to 5 marks if not specified
-                    }
-
-        except Exception as e:
-            st.error(f"Error: {str(e)}")
-            return None
+        Format the quiz exactly as follows:
+        Question: [The question]
+        Ideal Answer: [A comprehensive ideal answer that will be used for grading]
+        Key Points: [List 3-5 key points that should be included in a good answer]
+        """
 
-        attempt += 1
-        time.sleep(1)
+    completion = get_llm_gateway().chat_completion(
+        client,
+        model="llama-3.3-70b-versatile",
+        messages=[
+            {"role": "system", "content": "You are an expert educational quiz generator."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=500,
+        priority=BATCH
+    )
+
+    quiz_text = completion.choices[0].message.content
+
+    if question_type == "mcq":
+        question, options, correct_answer = parse_mcq_question(quiz_text)
+
+        if question:
+            return {
+                "type": "mcq",
+                "question": question,
+                "options": options,
+                "correct_answer": correct_answer,
+                "difficulty": difficulty,
+                "marks": 1  # Each MCQ is worth 1 mark
+            }
+    elif question_type == "true_false":
+        question, correct_answer, explanation = parse_true_false_question(quiz_text)
+
+        if question:
+            return {
+                "type": "true_false",
+                "question": question,
+                "correct_answer": correct_answer,
+                "explanation": explanation,
+                "difficulty": difficulty,
+                "marks": 1  # Each True/False is worth 1 mark
+            }
+    elif question_type == "fill_blank":
+        question, correct_answer = parse_fill_blank_question(quiz_text)
+
+        if question:
+            return {
+                "type": "fill_blank",
+                "question": question,
+                "correct_answer": correct_answer,
+                "difficulty": difficulty,
+                "marks": 1  # Each Fill in the blank is worth 1 mark
+            }
+    else:
+        question, ideal_answer, key_points = parse_subjective_question(quiz_text)
+
+        if question:
+            return {
+                "type": "subjective",
+                "question": question,
+                "ideal_answer": ideal_answer,
+                "key_points": key_points,
+                "difficulty": difficulty,
+                "marks": question_marks or 5  # Default to 5 marks if not specified
+            }
 
-    st.warning("Unable to generate unique questions. Try again.")
     return None
 
+def validate_question(question_type, item, difficulty, question_marks=None):
+    """Turn one item of a batched JSON reply into a quiz question, or None if it is malformed"""
+    if not isinstance(item, dict):
+        return None
+    question = str(item.get("question") or "").strip()
+    if not question:
+        return None
+
+    if question_type == "mcq":
+        options = item.get("options")
+        if not isinstance(options, dict):
+            return None
+        options = {key: str(options.get(key) or "").strip() for key in ["A", "B", "C", "D"]}
+        correct_answer = str(item.get("correct_answer") or "").strip().upper()[:1]
+        if not all(options.values()) or correct_answer not in options:
+            return None
+        return {
+            "type": "mcq",
+            "question": question,
+            "options": options,
+            "correct_answer": correct_answer,
+            "difficulty": difficulty,
+            "marks": 1
+        }
+    elif question_type == "true_false":
+        correct_answer = item.get("correct_answer")
+        if isinstance(correct_answer, str) and correct_answer.strip().lower() in ["true", "false"]:
+            correct_answer = correct_answer.strip().lower() == "true"
+        if not isinstance(correct_answer, bool):
+            return None
+        return {
+            "type": "true_false",
+            "question": question,
+            "correct_answer": correct_answer,
+            "explanation": str(item.get("explanation") or "").strip(),
+            "difficulty": difficulty,
+            "marks": 1
+        }
+    elif question_type == "fill_blank":
+        correct_answer = str(item.get("correct_answer") or "").strip()
+        if "__" not in question or not correct_answer:
+            return None
+        return {
+            "type": "fill_blank",
+            "question": question,
+            "correct_answer": correct_answer,
+            "difficulty": difficulty,
+            "marks": 1
+        }
+    else:
+        ideal_answer = str(item.get("ideal_answer") or "").strip()
+        key_points = item.get("key_points")
+        if not ideal_answer or not isinstance(key_points, list):
+            return None
+        key_points = [str(point).strip() for point in key_points if str(point).strip()]
+        if not key_points:
+            return None
+        return {
+            "type": "subjective",
+            "question": question,
+            "ideal_answer": ideal_answer,
+            "key_points": key_points[:5],
+            "difficulty": difficulty,
+            "marks": question_marks or 5
+        }
+
+def generate_question_batch(subject, topic, question_type, difficulty, description, count, question_marks=None, coverage=""):
+    """Generate `count` questions of one type in a single JSON request.
+
+    Returns only the items that pass validation; like generate_question it runs on a worker
+    thread and never calls Streamlit.
+    """
+    marks_text = f" worth {question_marks} marks each" if question_marks else ""
+    prompt = f"""
+    Generate {count} distinct {QUESTION_TYPE_NAMES[question_type]} quiz questions about {topic} in {subject} with {difficulty} difficulty{marks_text}.
+    Each question must test a different concept or angle; do not repeat or paraphrase a question.
+    {f"Concepts already covered by other questions (avoid them): {coverage}" if coverage else ""}
+
+    Additional context about the test:
+    {description}
+
+    Respond with only a JSON object of this shape:
+    {{"questions": [{QUESTION_JSON_FORMATS[question_type]}, ...]}}
+    """
+
+    completion = get_llm_gateway().chat_completion(
+        client,
+        model="llama-3.3-70b-versatile",
+        messages=[
+            {"role": "system", "content": "You are an expert educational quiz generator. You reply with valid JSON only."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=min(QUESTION_BATCH_TOKENS_PER_ITEM * count + 200, 8000),
+        response_format={"type": "json_object"},
+        priority=BATCH
+    )
+
+    try:
+        items = json.loads(completion.choices[0].message.content).get("questions", [])
+    except (ValueError, AttributeError):
+        # Unparseable reply: every item failed validation and falls back to single requests
+        return []
+
+    if not isinstance(items, list):
+        return []
+    questions = [validate_question(question_type, item, difficulty, question_marks) for item in items[:count]]
+    return [question for question in questions if question]
+
+def fold_plural(word):
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+def question_features(text):
+    """Content-word unigrams and bigrams of a question, with plurals folded"""
+    words = [
+        fold_plural(word)
+        for word in re.findall(r"[a-z0-9]+", text.lower())
+        if len(word) > 1 and word not in ENGLISH_STOP_WORDS
+    ]
+    return Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+class QuestionDeduplicator:
+    """Catches paraphrased duplicates by cosine similarity of question features, entirely locally"""
+
+    def __init__(self, threshold=DUPLICATE_SIMILARITY_THRESHOLD, context=""):
+        self.threshold = threshold
+        self.features = []
+        self.texts = set()
+        # Subject, topic and description words are what the quiz is about, never concepts to avoid
+        self.context_words = {
+            fold_plural(word) for word in re.findall(r"[a-z0-9]+", context.lower()) if word not in ENGLISH_STOP_WORDS
+        }
+        # Number of accepted questions mentioning each concept, in its surface form
+        self.concepts = Counter()
+
+    @staticmethod
+    def similarity(a, b):
+        dot = sum(count * b[term] for term, count in a.items() if term in b)
+        norm = math.sqrt(sum(c * c for c in a.values()) * sum(c * c for c in b.values()))
+        return dot / norm if norm else 0.0
+
+    def is_duplicate(self, question):
+        text = " ".join(question["question"].lower().split())
+        if text in self.texts:
+            return True
+        features = question_features(text)
+        return any(self.similarity(features, other) >= self.threshold for other in self.features)
+
+    def add(self, question):
+        text = " ".join(question["question"].lower().split())
+        features = question_features(text)
+        self.texts.add(text)
+        self.features.append(features)
+
+        words = re.findall(r"[a-z0-9]+", text)
+        concepts = {word for word in words if self._is_concept_word(word)}
+        concepts.update(f"{a} {b}" for a, b in zip(words, words[1:]) if a in concepts and b in concepts)
+        self.concepts.update(concepts)
+
+    def _is_concept_word(self, word):
+        if len(word) < 3 or word.isdigit() or word in ENGLISH_STOP_WORDS:
+            return False
+        folded = fold_plural(word)
+        if word in QUESTION_PHRASING_WORDS or folded in QUESTION_PHRASING_WORDS:
+            return False
+        # Prefix matching also drops derived forms, e.g. "gravitational" for the topic "Gravitation"
+        return not any(
+            folded == other or (min(len(folded), len(other)) >= 5 and (folded.startswith(other) or other.startswith(folded)))
+            for other in self.context_words
+        )
+
+    def coverage_summary(self, max_terms=COVERAGE_MAX_TERMS):
+        """Distinctive concepts covered so far, phrases first, so prompts stay the same size however long the quiz gets"""
+        generic_limit = max(2, len(self.features) * COVERAGE_GENERIC_SHARE)
+        ranked = sorted(
+            (term for term, count in self.concepts.most_common() if count <= generic_limit),
+            key=lambda term: " " not in term
+        )
+        summary = []
+        for term in ranked:
+            if len(summary) == max_terms:
+                break
+            # A word already named as part of a phrase adds nothing on its own
+            if " " not in term and any(term in phrase.split() for phrase in summary):
+                continue
+            summary.append(term)
+        return ", ".join(summary)
+
+def generate_quiz_questions(slots, subject, topic, difficulty, description, progress_callback=None, batch_size=QUESTION_BATCH_SIZE):
+    """Generate every question slot concurrently and return (questions in slot order, errors).
+
+    slots is a list of (question_type, marks). Slots of the same type are requested batch_size at a
+    time; slots a batch leaves unfilled (invalid or duplicate items) fall back to single-question
+    requests, which are retried up to MAX_QUESTION_ATTEMPTS times. At most QUIZ_GENERATION_WORKERS
+    requests are in flight.
+    """
+    slot_counts = {}
+    slot_numbers = []
+    for q_type, _ in slots:
+        slot_counts[q_type] = slot_counts.get(q_type, 0) + 1
+        slot_numbers.append(slot_counts[q_type])
+
+    # Each task is a list of slot indices of one type; a single index means a single-question request
+    queue = []
+    slots_by_type = {}
+    for i, (q_type, _) in enumerate(slots):
+        slots_by_type.setdefault(q_type, []).append(i)
+    for indices in slots_by_type.values():
+        step = max(batch_size, 1)
+        queue.extend(indices[k:k + step] for k in range(0, len(indices), step))
+
+    results = [None] * len(slots)
+    attempts = [0] * len(slots)
+    accepted = 0
+    deduplicator = QuestionDeduplicator(context=f"{subject} {topic} {description}")
+    errors = []
+    pending = {}
+    executor = get_io_executor()
+
+    while queue or pending:
+        while queue and len(pending) < QUIZ_GENERATION_WORKERS:
+            task = queue.pop(0)
+            q_type, q_marks = slots[task[0]]
+            for i in task:
+                attempts[i] += 1
+            coverage = deduplicator.coverage_summary()
+            if len(task) == 1:
+                future = executor.submit(
+                    generate_question, subject, topic, q_type, difficulty, description,
+                    q_marks, slot_numbers[task[0]], slot_counts[q_type], coverage
+                )
+            else:
+                future = executor.submit(
+                    generate_question_batch, subject, topic, q_type, difficulty, description,
+                    len(task), q_marks, coverage
+                )
+            pending[future] = task
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            task = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                if len(task) > 1:
+                    # e.g. json_validate_failed when the model breaks JSON mode: fall back to single requests
+                    queue.extend([i] for i in task if attempts[i] < MAX_QUESTION_ATTEMPTS)
+                else:
+                    # The gateway already retried transient failures, so give up on this slot
+                    errors.append(str(e))
+                continue
+
+            unfilled = list(task)
+            for question in (result if len(task) > 1 else [result]):
+                if unfilled and question and not deduplicator.is_duplicate(question):
+                    i = unfilled.pop(0)
+                    results[i] = question
+                    deduplicator.add(question)
+                    accepted += 1
+                    if progress_callback:
+                        progress_callback(accepted, len(slots))
+
+            queue.extend([i] for i in unfilled if attempts[i] < MAX_QUESTION_ATTEMPTS)
+
+    return [q for q in results if q], errors
+
 def parse_mcq_question(quiz_text):
     try:
         lines = quiz_text.strip().split("\n")
@@ -279,8 +584,7 @@ def parse_mcq_question(quiz_text):
 
         return question, options, correct_answer
     except Exception as e:
-        st.error(f"Error parsing MCQ question: {str(e)}")
-        return None, None, None
+        raise ValueError(f"Error parsing MCQ question: {str(e)}")
 
 def parse_true_false_question(quiz_text):
     try:
@@ -307,8 +611,7 @@ def parse_true_false_question(quiz_text):
 
         return question, correct_answer, explanation
     except Exception as e:
-        st.error(f"Error parsing True/False question: {str(e)}")
-        return None, None, None
+        raise ValueError(f"Error parsing True/False question: {str(e)}")
 
 def parse_fill_blank_question(quiz_text):
     try:
@@ -325,8 +628,7 @@ def parse_fill_blank_question(quiz_text):
 
         return question, correct_answer
     except Exception as e:
-        st.error(f"Error parsing Fill-in-the-blank question: {str(e)}")
-        return None, None
+        raise ValueError(f"Error parsing Fill-in-the-blank question: {str(e)}")
 
 def parse_subjective_question(quiz_text):
     try:
@@ -381,10 +683,25 @@ def parse_subjective_question(quiz_text):
             return question, ideal_answer, key_points[:5]  # Limit to 5 key points
         return None, None, None
     except Exception as e:
-        st.error(f"Error parsing subjective question: {str(e)}")
-        return None, None, None
+        raise ValueError(f"Error parsing subjective question: {str(e)}")
+
+def normalize_answer(answer):
+    return " ".join(str(answer or "").lower().split()).strip(" .,;:!?")
+
+def get_grade_cache_key(user_answer, question_data):
+    key_data = [GRADING_MODEL, question_data["question"], question_data["marks"], normalize_answer(user_answer)]
+    return hashlib.sha256(json.dumps(key_data).encode("utf-8")).hexdigest()
 
 def grade_subjective_answer(user_answer, question_data):
+    """Grade one answer with the LLM. Runs on a worker thread, so failures are returned, not shown"""
+    if not normalize_answer(user_answer):
+        return {"score": 0, "feedback": "No answer provided.", "points_addressed": [], "points_missed": question_data["key_points"]}
+
+    cache_key = get_grade_cache_key(user_answer, question_data)
+    cached_grade = grade_cache.get(cache_key)
+    if cached_grade is not None:
+        return dict(cached_grade, from_cache=True)
+
     try:
         prompt = f"""
         Grade this subjective answer for a quiz question worth {question_data['marks']} marks.
@@ -410,14 +727,16 @@ def grade_subjective_answer(user_answer, question_data):
         Key Points Missed: [List of missed points]
         """
 
-        completion = client.chat.completions.create(
-            model="mistral-saba-24b",
+        completion = get_llm_gateway().chat_completion(
+            client,
+            model=GRADING_MODEL,
             messages=[
                 {"role": "system", "content": "You are an expert educational grader. Be fair but thorough."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.3,
             max_tokens=500,
+            priority=BATCH
         )
 
         response = completion.choices[0].message.content
@@ -452,26 +771,102 @@ def grade_subjective_answer(user_answer, question_data):
                 if points_text and points_text.lower() != "none":
                     points_missed = [pt.strip() for pt in points_text.split(",")]
 
-        return {
+        grade = {
             "score": min(max(score, 0), question_data['marks']),  # Ensure score is between 0 and max marks
             "feedback": feedback,
             "points_addressed": points_addressed,
             "points_missed": points_missed
         }
+        grade_cache.set(cache_key, grade)
+        return grade
 
     except Exception as e:
-        st.error(f"Error grading answer: {str(e)}")
-        return {"score": 0, "feedback": "Error grading answer", "points_addressed": [], "points_missed": []}
-
-def update_timer():
-    while not st.session_state.timer_stop and st.session_state.timer_running and st.session_state.time_left > 0:
-        time.sleep(1)
-        st.session_state.time_left -= 1
-        if st.session_state.time_left <= 0:
-            st.session_state.quiz_submitted = True
-            st.session_state.auto_submitted = True
-            st.session_state.timer_running = False
-            break
+        # Not cached, so resubmitting the quiz retries the grading
+        return {"score": 0, "feedback": f"Error grading answer: {str(e)}", "points_addressed": [], "points_missed": [], "error": True}
+
+def render_subjective_result(placeholder, index, question, user_answer, grade):
+    if grade is None:
+        status = "<p>⏳ Grading...</p>"
+    else:
+        addressed = ", ".join(grade["points_addressed"]) or "None"
+        missed = ", ".join(grade["points_missed"]) or "None"
+        status = f"""
+            <p><strong>Feedback:</strong> {grade['feedback']}</p>
+            <div class='correct-answer'>✅ Key Points Addressed: {addressed}</div>
+            <div class='incorrect-answer'>❌ Key Points Missed: {missed}</div>
+            <p>Score: {grade['score']:g}/{question['marks']}{' ⚡' if grade.get('from_cache') else ''}</p>
+        """
+
+    placeholder.markdown(f"""
+    <div class='question-card'>
+        <h4>Question {index+1} (Subjective - {question['difficulty']} - {question['marks']} marks)</h4>
+        <p>{question["question"]}</p>
+        <p><strong>Your Answer:</strong> {user_answer if user_answer else 'Not answered'}</p>
+        {status}
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_final_score(placeholder, total_score, max_score, grading_left, late=False):
+    percentage = (total_score / max_score * 100) if max_score else 0
+    if grading_left:
+        label = f"Score so far: {total_score:g}/{max_score} ({grading_left} answer{'s' if grading_left > 1 else ''} still grading)"
+    else:
+        label = f"🏆 Final Score: {total_score:g}/{max_score} ({percentage:.1f}%)"
+    if late:
+        label += " · submitted late"
+    placeholder.markdown(f"<div class='final-score'>{label}</div>", unsafe_allow_html=True)
+
+def get_time_left():
+    """Seconds until the quiz deadline, computed from the clock instead of a ticking thread"""
+    if not st.session_state.quiz_deadline:
+        return 0
+    return max(0.0, st.session_state.quiz_deadline - time.time())
+
+def render_countdown(time_left):
+    """Count down in the browser and press Submit Quiz at zero, keeping whatever has been answered"""
+    # Rounded up, so the automatic click never reaches the server before the deadline
+    components.html(f"""
+    <div id="timer" style="font-size: 1.5rem; text-align: center; font-family: sans-serif;"></div>
+    <script>
+    const deadline = Date.now() + {math.ceil(time_left * 1000)};
+    const timer = document.getElementById("timer");
+
+    function tick() {{
+        const left = Math.max(0, Math.ceil((deadline - Date.now()) / 1000));
+        const mins = String(Math.floor(left / 60)).padStart(2, "0");
+        const secs = String(left % 60).padStart(2, "0");
+        timer.textContent = `Time Remaining: ${{mins}}:${{secs}}`;
+        timer.style.color = left < 60 ? "red" : "";
+
+        if (left > 0) {{
+            setTimeout(tick, 1000);
+            return;
+        }}
+        const submit = Array.from(window.parent.document.querySelectorAll("button"))
+            .find(button => button.innerText.trim() === "Submit Quiz");
+        if (submit) {{
+            submit.click();
+        }}
+    }}
+    tick();
+    </script>
+    """, height=50)
+
+def submit_quiz():
+    """Form callback: runs before the rerun, so the submission time is exact"""
+    submitted_at = time.time()
+    st.session_state.quiz_submitted = True
+    st.session_state.subjective_grades = {}
+    st.session_state.user_answers = {
+        i: st.session_state.get(f"answer_{i}", "") for i in range(len(st.session_state.quiz_data))
+    }
+    # Only the browser countdown submits at or after the deadline; anything past the grace period is late
+    st.session_state.auto_submitted = submitted_at >= st.session_state.quiz_deadline
+    st.session_state.submission_delay = max(0.0, submitted_at - st.session_state.quiz_deadline)
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes} min {seconds} s" if minutes else f"{seconds} s"
 
 # Main UI
 st.markdown("<div class='quiz-header'><h1>🎓QuizVerse - AI Quiz Generator</h1><p>Test your knowledge with AI-generated questions</p></div>", unsafe_allow_html=True)
@@ -512,6 +907,12 @@ with col2:
     include_fill_blank = st.checkbox("Fill in the Blank (1 mark each)", value=False)
     include_subjective = st.checkbox("Subjective Questions", value=True)
 
+batch_generation = st.checkbox(
+    f"Batch generation (up to {QUESTION_BATCH_SIZE} questions per request)",
+    value=True,
+    help="Fewer, larger requests. Items that fail validation are regenerated one at a time."
+)
+
 # Only show subjective question options if subjective is selected
 if include_subjective:
     subjective_marks = st.select_slider(
@@ -532,7 +933,9 @@ if st.button("Generate Quiz", type="primary"):
             st.session_state.quiz_generated = False
             st.session_state.quiz_submitted = False
             st.session_state.auto_submitted = False
-            st.session_state.timer_stop = False
+            st.session_state.submission_delay = 0
+            st.session_state.quiz_deadline = None
+            st.session_state.subjective_grades = {}
 
             # Create a list of question types to include
             question_types = []
@@ -550,27 +953,30 @@ if st.button("Generate Quiz", type="primary"):
                 questions_per_type = num_questions // len(question_types)
                 remaining = num_questions % len(question_types)
 
-                question_count = 0
+                slots = []
                 for q_type in question_types:
                     type_count = questions_per_type + (1 if remaining > 0 else 0)
                     remaining -= 1 if remaining > 0 else 0
 
-                    for i in range(type_count):
-                        q_marks = subjective_marks if q_type == "subjective" else None
-                        quiz_question = generate_question(subject, topic, q_type, difficulty, test_description, st.session_state.quiz_data, q_marks)
-                        if quiz_question:
-                            st.session_state.quiz_data.append(quiz_question)
-                            question_count += 1
-                            progress_bar.progress(question_count / num_questions)
+                    q_marks = subjective_marks if q_type == "subjective" else None
+                    slots.extend([(q_type, q_marks)] * type_count)
+
+                questions, errors = generate_quiz_questions(
+                    slots, subject, topic, difficulty, test_description,
+                    lambda done, total: progress_bar.progress(done / total),
+                    batch_size=QUESTION_BATCH_SIZE if batch_generation else 1
+                )
+                st.session_state.quiz_data = questions
+
+                for error in sorted(set(errors)):
+                    st.error(f"Error: {error}")
+                if len(questions) < len(slots):
+                    st.warning("Unable to generate unique questions. Try again.")
 
                 if st.session_state.quiz_data:
                     st.session_state.quiz_generated = True
-                    st.session_state.time_left = quiz_time * 60
-                    st.session_state.timer_running = True
-                    # Start the timer in a separate thread
-                    timer_thread = threading.Thread(target=update_timer)
-                    timer_thread.daemon = True  # Thread will close when main program exits
-                    timer_thread.start()
+                    # Only the deadline is stored; remaining time is derived from it on every run
+                    st.session_state.quiz_deadline = time.time() + quiz_time * 60
     else:
         st.warning("Please enter both subject and topic.")
 
@@ -586,15 +992,11 @@ if st.session_state.quiz_generated and not st.session_state.quiz_submitted and t
 # Display quiz
 if st.session_state.quiz_generated and not st.session_state.quiz_submitted:
     # Timer display
-    timer_placeholder = st.empty()
-
-    mins, secs = divmod(st.session_state.time_left, 60)
-    timer_class = "timer-warning" if st.session_state.time_left < 60 else ""
-    timer_placeholder.markdown(f"""
-    <div class="timer-display {timer_class}">
-        Time Remaining: {mins:02d}:{secs:02d}
-    </div>
-    """, unsafe_allow_html=True)
+    render_countdown(get_time_left())
+    # Form answers only reach the server on submit, so if the browser countdown never fired
+    # (scripts blocked, throttled background tab) the submission is recorded as late
+    if time.time() >= st.session_state.quiz_deadline + TIMER_GRACE_SECONDS:
+        st.error("⏰ Time is up. Submit now; your result will be marked as late.")
 
     st.markdown("### 📝 Answer all questions below")
 
@@ -634,14 +1036,14 @@ if st.session_state.quiz_generated and not st.session_state.quiz_submitted:
 
             st.markdown("<hr>", unsafe_allow_html=True)
 
-        submit_button = st.form_submit_button(label="Submit Quiz", type="primary")
-        if submit_button:
-            st.session_state.quiz_submitted = True
-            st.session_state.timer_running = False
-            st.session_state.timer_stop = True
+        # The browser countdown presses Submit itself when time runs out
+        st.form_submit_button(label="Submit Quiz", type="primary", on_click=submit_quiz)
 
-# Auto-submit notification
-if st.session_state.auto_submitted and st.session_state.quiz_submitted:
+# Submission timing notification
+if st.session_state.quiz_submitted and st.session_state.submission_delay > TIMER_GRACE_SECONDS:
+    st.error(f"⏰ Late submission: received {format_duration(st.session_state.submission_delay)} after the time limit. "
+             "This result is marked as late.")
+elif st.session_state.auto_submitted and st.session_state.quiz_submitted:
     st.warning("⏱️ Time's up! Your quiz has been automatically submitted.")
 
 # Show results
@@ -659,6 +1061,7 @@ if st.session_state.quiz_submitted:
 
     total_score = 0
     max_score = sum(q['marks'] for q in st.session_state.quiz_data)
+    pending_grades = {}
 
     for i, question in enumerate(st.session_state.quiz_data):
         user_answer = st.session_state.user_answers.get(i, "")
@@ -729,4 +1132,39 @@ if st.session_state.quiz_submitted:
                     <div class='correct-answer'>✨ Your Answer: {user_answer} is correct!</div>
                     <p>Score: {question_score}/{question['marks']}</p>
                 </div>
-                """, unsafe_allow_html=True)
\ No newline at end of file
+                """, unsafe_allow_html=True)
+            else:
+                st.markdown(f"""
+                <div class='question-card'>
+                    <h4>Question {i+1} (Fill in the Blank - {question['difficulty']} - {question['marks']} mark)</h4>
+                    <p>{question["question"]}</p>
+                    <div class='incorrect-answer'>❌ Your Answer: {user_answer if user_answer else 'Not answered'}</div>
+                    <div class='correct-answer'>✅ Correct Answer: {question["correct_answer"]}</div>
+                    <p>Score: 0/{question['marks']}</p>
+                </div>
+                """, unsafe_allow_html=True)
+
+        else:  # subjective
+            grade = st.session_state.subjective_grades.get(i)
+            placeholder = st.empty()
+            render_subjective_result(placeholder, i, question, user_answer, grade)
+            if grade is None:
+                pending_grades[get_io_executor().submit(grade_subjective_answer, user_answer, question)] = (i, placeholder)
+            else:
+                total_score += grade["score"]
+
+    score_placeholder = st.empty()
+    submitted_late = st.session_state.submission_delay > TIMER_GRACE_SECONDS
+    render_final_score(score_placeholder, total_score, max_score, len(pending_grades), submitted_late)
+
+    # All subjective answers are graded concurrently; each card fills in as its grade arrives
+    grading_left = len(pending_grades)
+    for future in as_completed(pending_grades):
+        i, placeholder = pending_grades[future]
+        grade = future.result()
+        if not grade.get("error"):
+            st.session_state.subjective_grades[i] = grade
+        total_score += grade["score"]
+        render_subjective_result(placeholder, i, st.session_state.quiz_data[i], st.session_state.user_answers.get(i, ""), grade)
+        grading_left -= 1
+        render_final_score(score_placeholder, total_score, max_score, grading_left, submitted_late)
@@ -1,10 +1,7 @@
 import streamlit as st
 import os
-import time
 import google.generativeai as genai
 from dotenv import load_dotenv
-import tiktoken
-import concurrent.futures
 from youtube_transcript_api import YouTubeTranscriptApi
 from docx import Document
 import json
@@ -12,7 +9,12 @@ import pandas as pd
 from datetime import datetime
 import re
 from streamlit_option_menu import option_menu
-import random
+from utils.http_client import get_http_client
+from utils.llm_gateway import get_llm_gateway, INTERACTIVE, BATCH
+from utils.video_cache import get_video_cache
+from utils.executors import get_llm_executor
+from utils.map_reduce import map_reduce, MERGE_FAN_IN
+from utils.tokenizer import encode, decode
 
 # Set page config at the very top
 st.set_page_config(
@@ -22,7 +24,7 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Define CHUNK_SIZE based on the model being used
+# Define CHUNK_SIZE (in tokens) based on the model being used
 MODEL_NAME = "gemini-1.5-pro"  # Default model
 CHUNK_SIZE = 200000 if MODEL_NAME == "gemini-1.5-pro" else 100000
 
@@ -40,6 +42,9 @@ genai.configure(api_key=GEMINI_API_KEY)
 # Set up Gemini model configuration
 model = genai.GenerativeModel(MODEL_NAME)
 
+# Shared across sessions, so popular lectures are fetched and generated once
+video_cache = get_video_cache()
+
 # Enhanced Custom CSS for better styling
 st.markdown("""
     <style>
@@ -214,89 +219,123 @@ def extract_video_id(url):
 
 def get_video_title(video_id):
     """Get the title of a YouTube video"""
+    title = video_cache.get_title(video_id)
+    if title is not None:
+        return title
+
     try:
-        import requests
         from bs4 import BeautifulSoup
         url = f"https://www.youtube.com/watch?v={video_id}"
-        response = requests.get(url)
+        response = get_http_client().get(url)
         soup = BeautifulSoup(response.text, 'html.parser')
         title = soup.find('title').text.replace(' - YouTube', '')
+        video_cache.set_title(video_id, title)
         return title
     except Exception:
         return f"Video {video_id}"
 
+def get_transcript_segments(video_id):
+    """Get the timed transcript segments of a YouTube video, from the cache when possible"""
+    segments = video_cache.get_transcript(video_id)
+    if segments is None:
+        segments = YouTubeTranscriptApi.get_transcript(video_id, languages=["en"])
+        video_cache.set_transcript(video_id, segments)
+    return segments
+
 def get_transcript(video_id):
-    """Get transcript from YouTube video"""
+    """Get transcript segments from YouTube video"""
     try:
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=["en"])
-        return " ".join([t["text"] for t in transcript_list])
+        return get_transcript_segments(video_id)
     except Exception as e:
         st.error(f"Error fetching transcript: {e}")
         return None
 
-def chunk_text(text, chunk_size):
-    """Split text into chunks of specified token size"""
-    encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")  # Using compatible tokenizer
-    tokens = encoding.encode(text)
-    chunks = [tokens[i:i + chunk_size] for i in range(0, len(tokens), chunk_size)]
-    return [encoding.decode(chunk) for chunk in chunks]
-
-def process_with_gemini(transcript, detail_level, output_type, model_name):
-    """Process transcript directly with Gemini, with fewer chunks due to higher token limits"""
+def is_error_result(result):
+    """Generation helpers report failures as "Error ..." strings; those must not be cached"""
+    return not result or result.startswith("Error ")
+
+def chunk_segments(segments, chunk_size):
+    """Pack transcript segments into chunks of at most chunk_size tokens in one pass.
+
+    Boundaries fall on segment edges, so no caption line is cut mid-sentence. Only a single
+    segment longer than chunk_size is split on raw tokens.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for segment in segments:
+        text = " ".join(segment["text"].split())
+        if not text:
+            continue
+        tokens = encode(text)
+        if len(tokens) > chunk_size:
+            pieces = [(decode(tokens[i:i + chunk_size]), len(tokens[i:i + chunk_size]))
+                      for i in range(0, len(tokens), chunk_size)]
+        else:
+            pieces = [(text, len(tokens))]
+
+        for piece, piece_tokens in pieces:
+            if current and current_tokens + piece_tokens > chunk_size:
+                chunks.append(" ".join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def process_with_gemini(segments, detail_level, output_type, model_name):
+    """Process transcript directly with Gemini, chunking only when it exceeds CHUNK_SIZE tokens"""
     try:
-        if len(transcript) > 30000:  # If still too large, break into chunks
-            transcript_chunks = chunk_text(transcript, CHUNK_SIZE)
+        transcript_chunks = chunk_segments(segments, CHUNK_SIZE)
+        if len(transcript_chunks) > 1:
             results = process_chunks_with_gemini(transcript_chunks, detail_level, output_type, model_name)
             return results
         else:
             # Process directly without chunking
-            result = generate_content_with_gemini(transcript, detail_level, output_type, model_name)
+            result = generate_content_with_gemini(transcript_chunks[0] if transcript_chunks else "",
+                                                  detail_level, output_type, model_name)
             return result
     except Exception as e:
         st.error(f"Error processing with Gemini: {e}")
         return "Error processing content. Please try again."
 
 def process_chunks_with_gemini(transcript_chunks, detail_level, output_type, model_name):
-    """Process multiple chunks with Gemini and merge results"""
-    results = []
-    total_chunks = len(transcript_chunks)
-
+    """Process chunks with Gemini, then merge the results in a tree that keeps the video's order"""
     progress_bar = st.progress(0)
     status_text = st.empty()
-
-    def process_chunk_with_retry(chunk, detail_level, output_type, model_name, retries=3):
-        for attempt in range(retries):
-            try:
-                return generate_content_with_gemini(chunk, detail_level, output_type, model_name)
-            except Exception as e:
-                st.error(f"Error: {e}. Retrying in {2 ** attempt} seconds...")
-                time.sleep(2 ** attempt + random.uniform(0, 1))  # Exponential backoff
-        raise RuntimeError("Failed to process chunk after multiple attempts.")
-
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future_to_chunk = {executor.submit(process_chunk_with_retry, chunk, detail_level, output_type, model_name): chunk for chunk in transcript_chunks}
-        for i, future in enumerate(concurrent.futures.as_completed(future_to_chunk)):
-            try:
-                result = future.result()
-                results.append(result)
-                st.write(f"Chunk {i+1} processed successfully.")
-            except Exception as exc:
-                st.error(f"Chunk {i+1} generated an exception: {exc}")
-            progress_bar.progress((i + 1) / total_chunks)
-            status_text.text(f"Processing chunk {i+1}/{total_chunks}...")
-
-    status_text.text("Merging results...")
-
-    # For summaries, notes, and quizzes, we need to merge intelligently
-    merged_result = merge_with_gemini(results, output_type, model_name)
+    status_text.text(f"Processing {len(transcript_chunks)} chunks...")
+
+    def report_progress(done, total, stage):
+        progress_bar.progress(done / total)
+        status_text.text(f"{'Processing chunks' if stage == 'map' else f'Merging results ({stage})'}: {done}/{total} steps")
+
+    # Chunks share one bounded, process-wide pool, and the LLM gateway's Gemini token bucket
+    # paces their calls. Workers never touch Streamlit: progress and errors are reported here.
+    # Finished chunks and merges are checkpointed, so retrying after a failure resumes from them.
+    merged_result = map_reduce(
+        transcript_chunks,
+        lambda chunk: generate_content_with_gemini(chunk, detail_level, output_type, model_name, BATCH),
+        lambda parts: merge_with_gemini(parts, output_type, model_name),
+        get_llm_executor(),
+        fan_in=MERGE_FAN_IN,
+        checkpoint=video_cache.checkpoints,
+        namespace=[output_type, detail_level, model_name],
+        progress_callback=report_progress
+    )
 
     progress_bar.progress(1.0)
     status_text.text("Processing complete!")
 
     return merged_result
 
-def generate_content_with_gemini(text, detail_level, output_type, model_name):
-    """Generate content using Gemini API based on output type"""
+def generate_content_with_gemini(text, detail_level, output_type, model_name, priority=INTERACTIVE):
+    """Generate content using Gemini API based on output type.
+
+    May run on a worker thread, so errors are raised to the caller instead of shown here.
+    """
 
     if output_type == "summary":
         prompt = f"""
@@ -390,16 +429,12 @@ def generate_content_with_gemini(text, detail_level, output_type, model_name):
         Text to analyze: {text}
         """
 
-    try:
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        st.error(f"Gemini API Error: {e}")
-        return f"Error generating {output_type}: {str(e)}"
+    model = genai.GenerativeModel(model_name)
+    response = get_llm_gateway().generate_content(model, prompt, priority=priority)
+    return response.text
 
 def merge_with_gemini(content_parts, output_type, model_name):
-    """Merge multiple content parts using Gemini"""
+    """Merge a few consecutive content parts using Gemini; runs on a worker thread and raises on failure"""
 
     # Join content parts with separators
     combined = "\n\n===CHUNK SEPARATOR===\n\n".join(content_parts)
@@ -437,6 +472,8 @@ def merge_with_gemini(content_parts, output_type, model_name):
 
         [Continue for exactly 2 questions total]
 
+        The parts are in the order they appear in the video; keep that chronological order.
+
         Content to merge:
         """
     else:
@@ -446,18 +483,16 @@ def merge_with_gemini(content_parts, output_type, model_name):
         structure but removes duplications. Merge similar sections, remove redundancies, and
         create a clean, unified document.
 
+        The parts are in the order they appear in the video; keep that chronological order.
+
         Content to merge:
         """
 
     prompt += combined
 
-    try:
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        st.error(f"Error merging content: {e}")
-        return "\n\n".join(content_parts)  # Fallback to simple concatenation
+    model = genai.GenerativeModel(model_name)
+    response = get_llm_gateway().generate_content(model, prompt, priority=BATCH)
+    return response.text
 
 def save_to_word(content, file_name="document.docx", title="Document"):
     """Save content to a Word document"""
@@ -568,35 +603,43 @@ def render_main_app():
             # Display video
             st.video(url)
 
-            with st.spinner("Fetching transcript..."):
-                transcript = get_transcript(video_id)
-                if transcript:
-                    st.success("Transcript fetched successfully.")
-
-                    selected_output = output_map[output_type]
-
-                    with st.spinner(f"Generating {selected_output}..."):
-                        # Process with Gemini directly with fewer chunks
-                        result = process_with_gemini(transcript, detail_level, selected_output, st.session_state.model_name)
+            selected_output = output_map[output_type]
+            model_name = st.session_state.model_name
 
-                        # Store in session state based on type
-                        if selected_output == "summary":
-                            st.session_state.current_summary = result
-                        elif selected_output == "notes":
-                            st.session_state.current_notes = result
-                        elif selected_output == "quiz":
-                            st.session_state.current_quiz = result
-
-                    # Add to history
-                    add_to_history(url, video_title, selected_output)
-
-                    # Display the result
-                    if selected_output == "quiz":
-                        display_quiz(result)
-                    else:
-                        display_content(result, selected_output, video_title)
-                else:
+            # Videos other students already processed skip the transcript fetch and Gemini entirely
+            result = video_cache.get_artifact(video_id, selected_output, detail_level, model_name)
+            if result is not None:
+                st.success(f"Loaded cached {selected_output} ⚡")
+            else:
+                with st.spinner("Fetching transcript..."):
+                    segments = get_transcript(video_id)
+                if not segments:
                     st.error("Could not fetch transcript. Ensure the video has English captions.")
+                    return
+                st.success("Transcript fetched successfully.")
+
+                with st.spinner(f"Generating {selected_output}..."):
+                    # Process with Gemini directly with fewer chunks
+                    result = process_with_gemini(segments, detail_level, selected_output, model_name)
+                if not is_error_result(result):
+                    video_cache.set_artifact(video_id, selected_output, detail_level, model_name, result)
+
+            # Store in session state based on type
+            if selected_output == "summary":
+                st.session_state.current_summary = result
+            elif selected_output == "notes":
+                st.session_state.current_notes = result
+            elif selected_output == "quiz":
+                st.session_state.current_quiz = result
+
+            # Add to history
+            add_to_history(url, video_title, selected_output)
+
+            # Display the result
+            if selected_output == "quiz":
+                display_quiz(result)
+            else:
+                display_content(result, selected_output, video_title)
         else:
             st.error("Invalid YouTube URL. Please check and try again.")
 
@@ -898,9 +941,20 @@ def display_quiz_results(questions):
     score_percentage = (correct_count / total_questions) * 100 if total_questions > 0 else 0
     st.markdown(f"<div class='final-score'>Your Score: {correct_count}/{total_questions} ({score_percentage:.2f}%)</div>", unsafe_allow_html=True)
 
+def render_cache_stats():
+    """Show how often transcripts, titles and generated content were served from the cache"""
+    stats = video_cache.stats()
+    col1, col2, col3 = st.columns(3)
+    for column, kind, label in [(col1, "transcript", "Transcripts"), (col2, "title", "Titles"), (col3, "artifact", "Generated content")]:
+        counts = stats[kind]
+        column.metric(f"{label} cache hit ratio", f"{counts['hit_ratio']:.0%}",
+                      help=f"{counts['hits']} hits, {counts['misses']} misses since the server started")
+    st.caption(f"{stats['entries']} cached entries, {stats['bytes'] / (1024 * 1024):.1f} MB on disk")
+
 def render_history():
     """Render the history of processed videos"""
     st.markdown("### 🕰️ History")
+    render_cache_stats()
 
     # Load history from file if not already in session state
     load_history()
@@ -917,7 +971,11 @@ def render_history():
 def render_settings():
     """Render settings page"""
     st.markdown("### ⚙️ Settings")
-    st.info("Settings page is under development. Stay tuned for more customization options!")
+
+    st.markdown("#### Cache")
+    render_cache_stats()
+
+    st.info("More settings are under development. Stay tuned for more customization options!")
 
 def main():
     """Main function to control the app flow"""
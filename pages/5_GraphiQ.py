@@ -1,8 +1,7 @@
 import streamlit as st
 import os
-import json
 import re
-import requests
+from utils.search_cache import serper_search
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
@@ -16,10 +15,11 @@ import sympy as sp
 from sympy.parsing.sympy_parser import parse_expr
 import streamlit.components.v1 as components
 from groq import Groq
+from utils.llm_gateway import get_llm_gateway
 import random
 
 # Initialize Groq client
-groq_client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+groq_client = Groq(api_key=os.environ.get("GROQ_API_KEY"), max_retries=0)  # Retries are handled by the LLM gateway
 
 # Initialize Serper API
 SERPER_API_KEY = os.environ.get("SERPER_API_KEY")
@@ -170,17 +170,7 @@ def search_web(query):
         return {"organic": []}
     
     try:
-        url = "https://google.serper.dev/search"
-        payload = json.dumps({
-            "q": query,
-            "num": 3
-        })
-        headers = {
-            'X-API-KEY': SERPER_API_KEY,
-            'Content-Type': 'application/json'
-        }
-        response = requests.request("POST", url, headers=headers, data=payload)
-        return response.json()
+        return serper_search("search", query, SERPER_API_KEY, num=3)
     except Exception as e:
         st.error(f"Error searching the web: {e}")
         return {"organic": []}
@@ -326,7 +316,8 @@ def evaluate_expression(expr_str):
 # Function to get a response from Groq API
 def get_groq_response(messages):
     try:
-        response = groq_client.chat.completions.create(
+        response = get_llm_gateway().chat_completion(
+            groq_client,
             messages=messages,
             model="llama3-70b-8192",
             temperature=0.5,
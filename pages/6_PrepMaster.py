@@ -2,6 +2,7 @@ import streamlit as st
 import os
 from dotenv import load_dotenv
 from groq import Groq
+from utils.llm_gateway import get_llm_gateway
 import datetime
 import docx
 from docx.shared import Inches
@@ -106,7 +107,7 @@ if not groq_api_key:
     st.error("❌ GROQ_API_KEY environment variable not set. Please set it.")
     st.stop()
 
-client = Groq(api_key=groq_api_key)
+client = Groq(api_key=groq_api_key, max_retries=0)  # Retries are handled by the LLM gateway
 
 # Header
 st.markdown('<h1 class="main-header">📚 PrepMaster - AI Study Plan Generator</h1>', unsafe_allow_html=True)
@@ -196,7 +197,8 @@ if generate_button:
                 """
 
                 # Call the Groq API
-                chat_completion = client.chat.completions.create(
+                chat_completion = get_llm_gateway().chat_completion(
+                    client,
                     messages=[{"role": "user", "content": prompt}],
                     model="llama-3.3-70b-versatile",
                     max_tokens=2048,
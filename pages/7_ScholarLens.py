@@ -2,8 +2,8 @@ import streamlit as st
 from groq import Groq
 import os
 from dotenv import load_dotenv
-import requests
-import json
+from utils.search_cache import serper_search
+from utils.llm_gateway import get_llm_gateway
 from datetime import datetime
 import re
 
@@ -28,7 +28,7 @@ if not serper_api_key:
     st.stop()
 
 # Initialize Groq client
-client = Groq(api_key=groq_api_key)
+client = Groq(api_key=groq_api_key, max_retries=0)  # Retries are handled by the LLM gateway
 
 # Initialize session state variables
 if "search_history" not in st.session_state:
@@ -46,53 +46,38 @@ if "saved_papers" not in st.session_state:
 
 def search_papers(query, limit=8):
     """Search for papers using Serper API (Google Scholar)"""
-    url = "https://google.serper.dev/scholar"
-    payload = json.dumps({
-        "q": query,
-        "num": limit
-    })
-    headers = {
-        'X-API-KEY': serper_api_key,
-        'Content-Type': 'application/json'
-    }
-    
     try:
         with st.spinner("Searching for papers..."):
-            response = requests.post(url, headers=headers, data=payload)
+            response = serper_search("scholar", query, serper_api_key, num=limit)
+            results = response.get("organic", [])
+            papers = []
             
-            if response.status_code == 200:
-                results = response.json().get("organic", [])
-                papers = []
-                
-                for i, result in enumerate(results):
-                    # Extract relevant information from Serper API response
-                    paper = {
-                        "id": f"paper_{i}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                        "title": result.get("title", "No title"),
-                        "authors": parse_authors(result.get("authors", "")),
-                        "year": extract_year(result.get("publicationInfo", "")),
-                        "venue": result.get("publication", "N/A"),
-                        "abstract": result.get("snippet", "No abstract available"),
-                        "url": result.get("link", "#"),
-                        "citation_count": extract_citation_count(result.get("citationCount", ""))
-                    }
-                    papers.append(paper)
-                
-                # Add search to history
-                if papers and query not in [h["query"] for h in st.session_state.search_history]:
-                    st.session_state.search_history.append({
-                        "query": query,
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                        "count": len(papers)
-                    })
-                    # Keep only last 10 searches
-                    if len(st.session_state.search_history) > 10:
-                        st.session_state.search_history.pop(0)
-                
-                return papers
-            else:
-                st.error(f"API Error: {response.status_code}, {response.text}")
-                return []
+            for i, result in enumerate(results):
+                # Extract relevant information from Serper API response
+                paper = {
+                    "id": f"paper_{i}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                    "title": result.get("title", "No title"),
+                    "authors": parse_authors(result.get("authors", "")),
+                    "year": extract_year(result.get("publicationInfo", "")),
+                    "venue": result.get("publication", "N/A"),
+                    "abstract": result.get("snippet", "No abstract available"),
+                    "url": result.get("link", "#"),
+                    "citation_count": extract_citation_count(result.get("citationCount", ""))
+                }
+                papers.append(paper)
+            
+            # Add search to history
+            if papers and query not in [h["query"] for h in st.session_state.search_history]:
+                st.session_state.search_history.append({
+                    "query": query,
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
+                    "count": len(papers)
+                })
+                # Keep only last 10 searches
+                if len(st.session_state.search_history) > 10:
+                    st.session_state.search_history.pop(0)
+            
+            return papers
     except Exception as e:
         st.error(f"Error searching papers: {str(e)}")
         return []
@@ -165,7 +150,8 @@ def analyze_paper(paper):
     
     try:
         with st.spinner(f"Analyzing paper: {paper['title']}..."):
-            response = client.chat.completions.create(
+            response = get_llm_gateway().chat_completion(
+                client,
                 model=st.session_state.model,
                 messages=[
                     {"role": "system", "content": "You are an academic research assistant that helps students understand research papers. Your analysis should be thorough yet accessible."},
@@ -5,11 +5,22 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 import uuid
-import requests
+from utils.http_client import get_http_client, RETRY_STATUS_CODES
+from utils.search_cache import serper_search
+from utils.single_flight import get_single_flight
 import json
 import hashlib
-import pickle
+import threading
+from collections import OrderedDict
 from pathlib import Path
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from utils.response_store import SQLiteResponseStore, RESPONSE_STORE_TTL_SECONDS
+from utils.lru_cache import LRUCache
+from utils.executors import get_io_executor
+from utils.llm_gateway import get_llm_gateway, INTERACTIVE, BATCH
 
 # Page configuration
 st.set_page_config(
@@ -542,61 +553,205 @@ MODEL_CONFIGS = {
 
 # Maximum number of messages to include in context window
 MAX_CONTEXT_MESSAGES = 10
+# Fold evicted messages into the running summary once this many have accumulated
+SUMMARY_FOLD_BATCH = 4
+SUMMARY_MAX_WORDS = 250
 
 # Set up cache directory
 CACHE_DIR = Path("./dsa_response_cache")
 CACHE_DIR.mkdir(exist_ok=True)
-
-# Cache implementation with improved path handling
+CACHE_DB_NAME = "responses.sqlite3"
+# Hot responses kept in memory in front of the SQLite file
+MEMORY_CACHE_MAX_ENTRIES = 2000
+
+# Similarity cache: reuse answers to near-identical questions
+SIMILARITY_CACHE_MAX_ENTRIES = 5000
+SIMILARITY_THRESHOLD = 0.85
+# Messages with fewer content terms carry too little signal to match
+SIMILARITY_MIN_TERMS = 2
+
+# Two-tier cache: an in-memory LRU (L1) in front of a single SQLite file (L2).
+# Legacy .pkl caches can be imported with: python -m utils.response_store dsa_response_cache
 class ResponseCache:
     def __init__(self, cache_dir=CACHE_DIR):
-        self.cache_dir = cache_dir
+        self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
+        self.memory = LRUCache(MEMORY_CACHE_MAX_ENTRIES, ttl_seconds=RESPONSE_STORE_TTL_SECONDS)
+        self.store = SQLiteResponseStore(self.cache_dir / CACHE_DB_NAME)
+        self.disk_hits = 0
+        self.disk_misses = 0
 
     def _generate_key(self, prompt, model):
-        """Generate a unique key for the cache based on prompt and model with safe path handling"""
-        # Create a hash of the prompt to use as filename
+        """Generate a unique key for the cache based on prompt and model"""
+        # Create a hash of the prompt
         prompt_str = json.dumps(prompt) if isinstance(prompt, list) else str(prompt)
         hash_obj = hashlib.md5(prompt_str.encode('utf-8'))
         hash_key = hash_obj.hexdigest()
 
-        # Sanitize model name to be file-system safe
+        # Same format as the old file names, so migrated entries keep hitting
         safe_model = model.replace('/', '_').replace('\\', '_').replace(':', '_').replace('-', '_')
-        return f"{safe_model}_{hash_key}.pkl"
+        return f"{safe_model}_{hash_key}"
 
     def get(self, prompt, model):
-        """Get cached response if it exists"""
+        """Get cached response if it exists, checking memory before disk"""
         key = self._generate_key(prompt, model)
-        cache_file = self.cache_dir / key
+        response = self.memory.get(key)
+        if response is not None:
+            return response
 
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'rb') as f:
-                    return pickle.load(f)
-            except Exception as e:
-                st.error(f"Error reading from cache: {e}")
-                return None
+        try:
+            response = self.store.get(key)
+        except Exception as e:
+            st.error(f"Error reading from cache: {e}")
+            return None
+
+        if response is None:
+            self.disk_misses += 1
+            return None
 
-        return None
+        # Promote disk hits so the next lookup needs no I/O
+        self.disk_hits += 1
+        self.memory.set(key, response)
+        return response
 
     def set(self, prompt, model, response):
-        """Cache a response with improved error handling"""
+        """Cache a response in both tiers (write-through)"""
         key = self._generate_key(prompt, model)
-        cache_file = self.cache_dir / key
-
-        # Ensure the directory exists before writing
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
-
+        self.memory.set(key, response)
         try:
-            with open(cache_file, 'wb') as f:
-                pickle.dump(response, f)
+            self.store.set(key, response)
             return True
         except Exception as e:
             st.error(f"Error writing to cache: {e}")
             return False
 
-# Initialize response cache
-response_cache = ResponseCache()
+    def clear(self):
+        self.memory.clear()
+        self.store.clear()
+
+    def stats(self):
+        """Hit ratio per tier; the disk ratio only counts lookups that missed memory"""
+        memory_stats = self.memory.stats()
+        disk_lookups = self.disk_hits + self.disk_misses
+        return {
+            "memory_hit_ratio": memory_stats["hit_ratio"],
+            "memory_entries": memory_stats["entries"],
+            "disk_hit_ratio": self.disk_hits / disk_lookups if disk_lookups else 0.0,
+            "lookups": memory_stats["hits"] + memory_stats["misses"],
+        }
+
+class SimilarityCache:
+    """Matches a new question to previously answered ones by TF-IDF cosine similarity"""
+
+    def __init__(self, max_entries=SIMILARITY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # Stateless, so questions can be vectorized without refitting anything. The token pattern keeps
+        # one-character tokens and trailing +/# so "C", "C++" and "C#" stay distinct.
+        self.vectorizer = HashingVectorizer(
+            stop_words='english', ngram_range=(1, 2), alternate_sign=False, norm=None, n_features=2 ** 20,
+            token_pattern=r"(?u)\b\w[\w+#]*"
+        )
+        self.requests = 0
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self._entries = OrderedDict()
+        self._scopes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_scope(model_name, system_prompt, previous_answer=""):
+        """Questions only match within a scope: same model, system prompt and preceding assistant turn"""
+        context = json.dumps([system_prompt or "", previous_answer or ""])
+        return (model_name, hashlib.md5(context.encode('utf-8')).hexdigest())
+
+    def _vectorize(self, question):
+        counts = self.vectorizer.transform([question]).tocsr()
+        return counts if counts.nnz >= SIMILARITY_MIN_TERMS else None
+
+    def _scope_matrix(self, scope):
+        """Stacked term counts and document frequencies for one scope, rebuilt after changes"""
+        cached = self._scopes.get(scope)
+        if cached is not None:
+            return cached
+
+        keys = [key for key, entry in self._entries.items() if entry['scope'] == scope]
+        if not keys:
+            return None
+        counts = sp.vstack([self._entries[key]['counts'] for key in keys], format='csr')
+        df = np.bincount(counts.indices, minlength=counts.shape[1])
+        self._scopes[scope] = (keys, counts, df)
+        return self._scopes[scope]
+
+    def lookup(self, scope, question, threshold=SIMILARITY_THRESHOLD):
+        """Return the stored answer of the most similar question above the threshold, or None"""
+        query_counts = self._vectorize(question)
+        if query_counts is None:
+            return None
+
+        with self._lock:
+            matrix = self._scope_matrix(scope)
+            if matrix is None:
+                return None
+            keys, counts, df = matrix
+
+            # Smoothed IDF over the questions answered so far in this scope
+            idf = np.log((1 + len(keys)) / (1 + df[query_counts.indices])) + 1
+            query_vector = sp.csr_matrix(
+                (query_counts.data * idf, query_counts.indices, [0, query_counts.nnz]),
+                shape=query_counts.shape
+            )
+            weighted = counts.copy().astype(np.float64)
+            weighted.data *= np.log((1 + len(keys)) / (1 + df[weighted.indices])) + 1
+            similarities = (normalize(weighted) @ normalize(query_vector).T).toarray().ravel()
+
+            best = int(np.argmax(similarities))
+            if similarities[best] < threshold:
+                return None
+            self._entries.move_to_end(keys[best])
+            return self._entries[keys[best]]['answer']
+
+    def add(self, scope, question, answer):
+        query_counts = self._vectorize(question)
+        if query_counts is None:
+            return
+
+        key = (scope, question.strip().lower())
+        with self._lock:
+            self._entries[key] = {'scope': scope, 'counts': query_counts, 'answer': answer}
+            self._entries.move_to_end(key)
+            self._scopes.pop(scope, None)
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._scopes.pop(evicted['scope'], None)
+
+    def record(self, exact_hit=False, similar_hit=False):
+        """Count a generation request and whether the cache answered it"""
+        with self._lock:
+            self.requests += 1
+            self.exact_hits += exact_hit
+            self.similar_hits += similar_hit
+
+    def stats(self):
+        deflected = self.exact_hits + self.similar_hits
+        return {
+            "requests": self.requests,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "deflection_rate": deflected / self.requests if self.requests else 0.0,
+        }
+
+@st.cache_resource
+def get_similarity_cache():
+    return SimilarityCache()
+
+similarity_cache = get_similarity_cache()
+
+# Initialize response cache once per process
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+response_cache = get_response_cache()
 
 # Initialize session state
 if "chats" not in st.session_state:
@@ -611,6 +766,10 @@ if "use_cache" not in st.session_state:
     st.session_state.use_cache = True
 if "search_enabled" not in st.session_state:
     st.session_state.search_enabled = True
+if "use_similarity_cache" not in st.session_state:
+    st.session_state.use_similarity_cache = True
+if "similarity_threshold" not in st.session_state:
+    st.session_state.similarity_threshold = SIMILARITY_THRESHOLD
 
 def create_new_chat():
     """Create a new chat and return its ID"""
@@ -619,7 +778,8 @@ def create_new_chat():
         "title": f"New DSA Chat {len(st.session_state.chats) + 1}",
         "messages": [],
         "created_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
-        "summary": ""  # To store the conversation summary for context management
+        "summary": "",  # To store the conversation summary for context management
+        "summary_watermark": 0  # Number of leading messages already folded into the summary
     }
     return chat_id
 
@@ -637,8 +797,8 @@ def get_chat_title(messages):
         return first_msg[:30] + "..." if len(first_msg) > 30 else first_msg
     return "New DSA Chat"
 
-def search_web(query, num_results=5):
-    """Search the web using Serper API"""
+def fetch_search_results(query, num_results=5):
+    """Query the Serper API; raises on failure and never touches Streamlit, so it can run in a worker thread"""
     if not serper_api_key:
         return {
             "organic": [
@@ -650,24 +810,12 @@ def search_web(query, num_results=5):
             ]
         }
 
-    headers = {
-        'X-API-KEY': serper_api_key,
-        'Content-Type': 'application/json'
-    }
-
-    payload = {
-        "q": query,
-        "num": num_results
-    }
+    return serper_search("search", query, serper_api_key, num=num_results)
 
+def wait_for_search(search_future):
+    """Collect a search started with fetch_search_results, reporting errors from the script thread"""
     try:
-        response = requests.post(
-            'https://google.serper.dev/search',
-            headers=headers,
-            json=payload
-        )
-        response.raise_for_status()
-        return response.json()
+        return search_future.result()
     except Exception as e:
         st.error(f"Search error: {e}")
         return {"organic": []}
@@ -700,7 +848,8 @@ def generate_follow_up_questions(response_text, query):
 
         if provider == 'gemini':
             model = GenerativeModel(model_name)
-            follow_up_response = model.generate_content(
+            follow_up_response = get_llm_gateway().generate_content(
+                model,
                 [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": f"Original query: {query}\n\nAI response: {response_text[:1000]}..."}
@@ -709,12 +858,14 @@ def generate_follow_up_questions(response_text, query):
                     'temperature': 0.7,
                     'max_output_tokens': 150,
                     'top_p': 1.0
-                }
+                },
+                priority=BATCH
             )
             response_text = follow_up_response.text.strip() if hasattr(follow_up_response, 'text') else ""
         else:
-            client = Groq(api_key=groq_api_key)
-            follow_up_response = client.chat.completions.create(
+            client = Groq(api_key=groq_api_key, max_retries=0)
+            follow_up_response = get_llm_gateway().chat_completion(
+                client,
                 model=model_name,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -723,7 +874,8 @@ def generate_follow_up_questions(response_text, query):
                 temperature=0.7,
                 max_tokens=150,
                 top_p=1.0,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                priority=BATCH
             )
             response_text = follow_up_response.choices[0].message.content.strip()
 
@@ -841,8 +993,8 @@ def format_messages_for_groq(messages, system_prompt):
 
     return formatted_messages
 
-def call_groq_api(messages, model_name, config):
-    """Call the Groq API directly"""
+def call_groq_api(messages, model_name, config, priority=INTERACTIVE):
+    """Call the Groq API directly, through the shared LLM gateway"""
     url = "https://api.groq.com/openai/v1/chat/completions"
 
     headers = {
@@ -858,7 +1010,14 @@ def call_groq_api(messages, model_name, config):
         "top_p": config.get('top_p', 1.0)
     }
 
-    response = requests.post(url, json=data, headers=headers)
+    def send():
+        # The gateway owns retries, so surface retryable statuses to it instead of retrying here
+        response = get_http_client().post(url, json=data, headers=headers, max_retries=0)
+        if response.status_code in RETRY_STATUS_CODES:
+            response.raise_for_status()
+        return response
+
+    response = get_llm_gateway().call("groq", model_name, send, priority)
 
     if response.status_code == 200:
         response_data = response.json()
@@ -897,47 +1056,58 @@ def get_optimized_message_history(chat_id):
             "content": f"Here's a summary of the earlier conversation: {summary}\n\nNow continue helping with the latest messages."
         })
 
-    # Add the most recent MAX_CONTEXT_MESSAGES messages
-    recent_messages = messages[-MAX_CONTEXT_MESSAGES:]
+    # Everything after the watermark is sent verbatim, so no message falls between summary and context
+    watermark = chat.get("summary_watermark", 0) if summary else 0
+    recent_messages = messages[watermark:] if watermark else messages[-MAX_CONTEXT_MESSAGES:]
+
     for msg in recent_messages:
         result.append({"role": msg["role"], "content": msg["content"]})
 
     return result
 
 def generate_conversation_summary(messages, chat_id=None):
-    """Generate a summary of the conversation to maintain context while reducing tokens."""
-    if not messages or len(messages) <= 1:
-        return ""
+    """Fold messages that left the context window into the running summary.
 
-    # Only summarize if we have more than MAX_CONTEXT_MESSAGES
-    if len(messages) <= MAX_CONTEXT_MESSAGES:
+    Only messages between the stored watermark and the start of the context window are sent,
+    together with the previous summary, so each update costs the same regardless of chat length.
+    """
+    if not messages or len(messages) <= MAX_CONTEXT_MESSAGES:
         return ""
 
-    # Get earlier messages to summarize (except the most recent MAX_CONTEXT_MESSAGES)
-    messages_to_summarize = messages[:-MAX_CONTEXT_MESSAGES]
+    chat = st.session_state.chats.get(chat_id, {}) if chat_id else {}
+    previous_summary = chat.get("summary", "")
+    watermark = chat.get("summary_watermark", 0) if previous_summary else 0
+    evict_end = len(messages) - MAX_CONTEXT_MESSAGES
+    if evict_end <= watermark:
+        return previous_summary
+
+    messages_to_summarize = messages[watermark:evict_end]
 
     try:
-        # Create a prompt to summarize the conversation
-        summary_prompt = "Summarize the following conversation about Data Structures and Algorithms in a concise way that preserves the key technical details, questions asked, and knowledge shared. Here's the conversation:\n\n"
+        # Create a prompt that updates the previous summary with the newly evicted messages
+        summary_prompt = (
+            "You maintain a running summary of a conversation about Data Structures and Algorithms. "
+            "Update the summary with the new messages below, preserving the key technical details, "
+            f"questions asked, and knowledge shared. Keep it under {SUMMARY_MAX_WORDS} words.\n\n"
+        )
+        if previous_summary:
+            summary_prompt += f"Current summary:\n{previous_summary}\n\n"
+        summary_prompt += "New messages:\n\n"
 
         for msg in messages_to_summarize:
             summary_prompt += f"{msg['role'].upper()}: {msg['content']}\n\n"
 
+        model_name = MODELS[st.session_state.model]
+        provider = MODEL_PROVIDERS[st.session_state.model]
+
         # Check cache first
         cached_response = None
         if st.session_state.use_cache:
-            cached_response = response_cache.get(summary_prompt, MODELS[st.session_state.model])
+            cached_response = response_cache.get(summary_prompt, model_name)
 
         if cached_response:
             summary = cached_response
         else:
-            # Get the summary from the selected model
-            model_name = MODELS[st.session_state.model]
-            provider = MODEL_PROVIDERS[st.session_state.model]
-
-            # Get the system prompt
-            system_prompt = get_dsa_system_prompt()
-
             if provider == 'gemini':
                 # Use Google AI
                 model = GenerativeModel(model_name)
@@ -954,9 +1124,11 @@ def generate_conversation_summary(messages, chat_id=None):
                     'top_p': 1.0
                 })
 
-                response = model.generate_content(
+                response = get_llm_gateway().generate_content(
+                    model,
                     formatted_prompt,
-                    generation_config=config
+                    generation_config=config,
+                    priority=BATCH
                 )
 
                 summary = response.text if hasattr(response, 'text') else ""
@@ -974,22 +1146,59 @@ def generate_conversation_summary(messages, chat_id=None):
                     'top_p': 1.0
                 })
 
-                summary = call_groq_api(formatted_messages, model_name, config)
+                summary = call_groq_api(formatted_messages, model_name, config, priority=BATCH)
 
-        # Cache the response
-        if st.session_state.use_cache:
-            response_cache.set(summary_prompt, model_name, summary)
+            # Cache the response
+            if st.session_state.use_cache and summary:
+                response_cache.set(summary_prompt, model_name, summary)
 
-        # Save the summary if we have a chat_id
+        if not summary:
+            return previous_summary
+
+        # Save the summary and how far it reaches if we have a chat_id
         if chat_id and chat_id in st.session_state.chats:
             st.session_state.chats[chat_id]["summary"] = summary
+            st.session_state.chats[chat_id]["summary_watermark"] = evict_end
 
         return summary
 
     except Exception as e:
-        # If summarization fails, just return a basic summary
+        # If summarization fails, keep the previous summary; the unsummarized messages stay in context
+        if previous_summary:
+            return previous_summary
         return f"This conversation covers DSA topics including {', '.join(set([msg.get('topic', 'various DSA concepts') for msg in messages_to_summarize if 'topic' in msg]))}."
 
+def generate_model_response(provider, model_name, formatted_messages):
+    """Call the selected provider; never touches Streamlit, so its result can be shared across sessions"""
+    if provider == 'gemini':
+        # Use Google AI
+        model = GenerativeModel(model_name)
+
+        # Get model-specific configuration
+        config = MODEL_CONFIGS.get(model_name, {
+            'temperature': 0.7,
+            'max_output_tokens': 2048,
+            'top_p': 1.0
+        })
+
+        # Generate response with model-specific configurations
+        response = get_llm_gateway().generate_content(
+            model,
+            formatted_messages,
+            generation_config=config
+        )
+
+        return response.text if hasattr(response, 'text') else "Error: No response received."
+
+    # Use Groq API
+    config = MODEL_CONFIGS.get(model_name, {
+        'temperature': 0.7,
+        'max_tokens': 2048,
+        'top_p': 1.0
+    })
+
+    return call_groq_api(formatted_messages, model_name, config)
+
 def get_response_with_cag(messages, system_prompt):
     """Get response from the model with cache-augmented generation and improved error handling"""
     selected_model = st.session_state.model
@@ -1010,50 +1219,52 @@ def get_response_with_cag(messages, system_prompt):
 
     # Check cache first if enabled
     cached_response = None
+    last_user_index = next((i for i in range(len(messages) - 1, -1, -1) if messages[i]["role"] == "user"), None)
+    last_user_message = messages[last_user_index]["content"] if last_user_index is not None else ""
+    # Follow-ups such as "and its time complexity?" only mean something after the answer (or conversation
+    # summary) they follow, so that is part of the scope; opening questions share a scope across sessions
+    previous_answer = next(
+        (msg["content"] for msg in reversed(messages[:last_user_index or 0]) if msg["role"] != "user"), ""
+    )
+    similarity_scope = SimilarityCache.make_scope(model_name, system_prompt, previous_answer)
     if st.session_state.use_cache:
         cached_response = response_cache.get(formatted_messages, model_name)
+        if cached_response:
+            similarity_cache.record(exact_hit=True)
+        elif st.session_state.use_similarity_cache:
+            # Fall back to an answer for a near-identical question asked at the same point of a conversation
+            cached_response = similarity_cache.lookup(
+                similarity_scope, last_user_message, st.session_state.similarity_threshold
+            )
+            if cached_response:
+                similarity_cache.record(similar_hit=True)
+                response_cache.set(formatted_messages, model_name, cached_response)
 
     if cached_response:
         return cached_response, True  # Return cached response and flag that it was from cache
 
-    # If not in cache, generate new response
-    try:
-        if provider == 'gemini':
-            # Use Google AI
-            model = GenerativeModel(model_name)
-
-            # Get model-specific configuration
-            config = MODEL_CONFIGS.get(model_name, {
-                'temperature': 0.7,
-                'max_output_tokens': 2048,
-                'top_p': 1.0
-            })
+    similarity_cache.record()
 
-            # Generate response with model-specific configurations
-            response = model.generate_content(
-                formatted_messages,
-                generation_config=config
-            )
-
-            bot_response = response.text if hasattr(response, 'text') else "Error: No response received."
+    # Start the web search now so it runs while the model generates
+    search_query = messages[-1]["content"]  # Use the last user message as the search query
+    search_future = None
+    if st.session_state.search_enabled:
+        search_future = get_io_executor().submit(fetch_search_results, search_query)
 
-        else:  # 'groq'
-            # Use Groq API
-            config = MODEL_CONFIGS.get(model_name, {
-                'temperature': 0.7,
-                'max_tokens': 2048,
-                'top_p': 1.0
-            })
-
-            bot_response = call_groq_api(formatted_messages, model_name, config)
+    # If not in cache, generate new response
+    try:
+        # Identical prompts already in flight (from any session) share one model call
+        flight_key = response_cache._generate_key(formatted_messages, model_name)
+        bot_response = get_single_flight().do(
+            flight_key, generate_model_response, provider, model_name, formatted_messages
+        )
 
-        # Perform web search to enhance the response
-        search_query = messages[-1]["content"]  # Use the last user message as the search query
+        # Collect the web search that ran alongside generation
         search_results = {}
         sources = []
 
-        if st.session_state.search_enabled:
-            search_results = search_web(search_query)
+        if search_future is not None:
+            search_results = wait_for_search(search_future)
             sources = extract_relevant_info(search_results, search_query)
 
         if sources:
@@ -1065,10 +1276,13 @@ def get_response_with_cag(messages, system_prompt):
         # Cache the response
         if st.session_state.use_cache:
             response_cache.set(formatted_messages, model_name, bot_response)
+            similarity_cache.add(similarity_scope, last_user_message, bot_response)
 
         return bot_response, False  # Return new response and flag that it was not from cache
 
     except Exception as e:
+        if search_future is not None:
+            search_future.cancel()
         error_msg = str(e)
         # Add more detailed error handling
         if "not found" in error_msg.lower() and "model" in error_msg.lower():
@@ -1157,11 +1371,41 @@ with st.sidebar:
                                            help="Use cached responses when available to improve response time")
 
     if st.session_state.use_cache:
+        st.session_state.use_similarity_cache = st.checkbox(
+            "Match similar questions", value=True,
+            help="Reuse the answer to a previously asked question that is worded differently"
+        )
+        st.session_state.similarity_threshold = st.slider(
+            "Similarity threshold", min_value=0.5, max_value=1.0, value=SIMILARITY_THRESHOLD, step=0.05,
+            disabled=not st.session_state.use_similarity_cache
+        )
+        similarity_stats = similarity_cache.stats()
+        st.caption(
+            f"LLM calls deflected: {similarity_stats['deflection_rate']:.0%} of {similarity_stats['requests']} "
+            f"({similarity_stats['exact_hits']} exact, {similarity_stats['similar_hits']} similar)"
+        )
+
+        cache_stats = response_cache.stats()
+        st.caption(
+            f"Cache hit ratio: memory {cache_stats['memory_hit_ratio']:.0%}, "
+            f"disk {cache_stats['disk_hit_ratio']:.0%} ({cache_stats['lookups']} lookups, "
+            f"{cache_stats['memory_entries']} in memory)"
+        )
+        flight_stats = get_single_flight().stats()
+        st.caption(
+            f"Shared in-flight calls: {flight_stats['coalesced']} coalesced, "
+            f"{flight_stats['executed']} executed"
+        )
+        model_stats = get_llm_gateway().stats().get(f"{MODEL_PROVIDERS[st.session_state.model]}/{MODELS[st.session_state.model]}")
+        if model_stats:
+            st.caption(
+                f"Model calls: {model_stats['calls']}, avg {model_stats['avg_latency']:.1f}s "
+                f"(p95 {model_stats['p95_latency']:.1f}s), {model_stats['rate_limited']} rate-limited, "
+                f"queue {model_stats['queue_depth']}"
+            )
         if st.button("Clear Cache"):
             try:
-                # Delete all files in cache directory
-                for file in CACHE_DIR.glob("*.pkl"):
-                    file.unlink()
+                response_cache.clear()
                 st.success("Cache cleared successfully!")
             except Exception as e:
                 st.error(f"Error clearing cache: {e}")
@@ -1237,9 +1481,9 @@ if st.session_state.study_mode == "Chat":
         with st.chat_message("user", avatar="👤"):
             st.markdown(user_input)
 
-        # Update context if needed (if we've crossed the threshold)
-        if len(current_chat["messages"]) > MAX_CONTEXT_MESSAGES and len(current_chat["messages"]) % 5 == 0:
-            # Regenerate summary every 5 messages after hitting the limit
+        # Fold newly evicted messages into the summary once a batch has built up
+        evicted_count = len(current_chat["messages"]) - MAX_CONTEXT_MESSAGES
+        if evicted_count - current_chat.get("summary_watermark", 0) >= SUMMARY_FOLD_BATCH:
             _ = generate_conversation_summary(current_chat["messages"], st.session_state.current_chat_id)
 
         # Get optimized message history (summary + recent messages)
@@ -3,14 +3,14 @@ import streamlit as st
 import google.generativeai as genai
 import pytube
 import fitz  # PyMuPDF
-import requests
+from utils.http_client import get_http_client
+from utils.llm_gateway import get_llm_gateway
 import re
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 import networkx as nx
 import matplotlib.pyplot as plt
 from pyvis.network import Network
-import tempfile
 import base64
 from streamlit_extras.switch_page_button import switch_page
 import json
@@ -18,6 +18,7 @@ from PIL import Image
 from io import BytesIO
 import time
 import random
+from utils.pdf_text_cache import content_hash, get_pdf_text_cache
 
 # Load environment variables
 load_dotenv()
@@ -268,6 +269,9 @@ def get_model():
 
 model = get_model()
 
+# Cache namespace for PyMuPDF output in the shared PDF text cache
+PDF_EXTRACTOR_NAME = "pymupdf"
+
 def extract_text_from_youtube(youtube_url):
     """Extract transcript from a YouTube video"""
     try:
@@ -299,31 +303,40 @@ def extract_text_from_pdf(pdf_file):
     """Extract text from a PDF file"""
     try:
         with st.spinner("Extracting text from PDF..."):
-            # Save uploaded file temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                tmp_file.write(pdf_file.getvalue())
-                tmp_file_path = tmp_file.name
-            
-            # Extract text from PDF
-            doc = fitz.open(tmp_file_path)
-            
+            pdf_bytes = pdf_file.getvalue()
+            pdf_hash = content_hash(pdf_bytes)
+            pdf_cache = get_pdf_text_cache()
+
+            # Serve previously uploaded files without parsing them again
+            cached = pdf_cache.get(pdf_hash, PDF_EXTRACTOR_NAME)
+            if cached is not None:
+                pages = cached["pages"]
+                pdf_metadata = cached["metadata"]
+            else:
+                # Extract text from PDF
+                doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+                pages = [page.get_text() for page in doc]
+                pdf_metadata = {key: doc.metadata.get(key, 'Unknown') for key in ("title", "author", "subject")}
+                doc.close()
+                try:
+                    pdf_cache.set(pdf_hash, PDF_EXTRACTOR_NAME, pages, pdf_metadata)
+                except Exception:
+                    # A cache failure should never fail the extraction itself
+                    pass
+
             # Get PDF metadata
-            metadata = f"Title: {doc.metadata.get('title', 'Unknown')}\n"
-            metadata += f"Author: {doc.metadata.get('author', 'Unknown')}\n"
-            metadata += f"Subject: {doc.metadata.get('subject', 'Unknown')}\n"
-            metadata += f"Total Pages: {len(doc)}\n\n"
+            metadata = f"Title: {pdf_metadata.get('title', 'Unknown')}\n"
+            metadata += f"Author: {pdf_metadata.get('author', 'Unknown')}\n"
+            metadata += f"Subject: {pdf_metadata.get('subject', 'Unknown')}\n"
+            metadata += f"Total Pages: {len(pages)}\n\n"
             
             text = metadata
             
             # Extract text with page numbers
-            for i, page in enumerate(doc):
-                page_text = page.get_text()
+            for i, page_text in enumerate(pages):
                 if page_text.strip():  # Only add non-empty pages
                     text += f"Page {i+1}:\n{page_text}\n\n"
             
-            # Clean up temporary file
-            os.unlink(tmp_file_path)
-            
             return text
     except Exception as e:
         st.error(f"Error extracting PDF text: {str(e)}")
@@ -333,7 +346,7 @@ def extract_text_from_url(url):
     """Extract text from a webpage"""
     try:
         with st.spinner("Extracting content from URL..."):
-            response = requests.get(url, headers={
+            response = get_http_client().get(url, headers={
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             })
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -499,7 +512,7 @@ def generate_mindmap_json(text, theme_option="standard", complexity="standard"):
                 progress_bar.progress((i+1) * 10)
                 time.sleep(0.3)
                 
-            response = model.generate_content(prompt)
+            response = get_llm_gateway().generate_content(model, prompt)
             response_text = response.text
             
             # Complete progress bar
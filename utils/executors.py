@@ -0,0 +1,38 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Network-bound work (search, LLM calls) spends its time waiting, so the pool can be wide
+IO_MAX_WORKERS = 32
+# Cap on concurrent fan-out LLM jobs (e.g. transcript chunks) across every session
+LLM_MAX_WORKERS = 8
+
+_io_executor = None
+_io_executor_lock = threading.Lock()
+_llm_executor = None
+_llm_executor_lock = threading.Lock()
+
+
+def get_io_executor():
+    """Process-wide thread pool for overlapping independent network calls.
+
+    Tasks must not call Streamlit APIs or read st.session_state; pass values in and
+    render results from the script thread.
+    """
+    global _io_executor
+    with _io_executor_lock:
+        if _io_executor is None:
+            _io_executor = ThreadPoolExecutor(max_workers=IO_MAX_WORKERS, thread_name_prefix="io")
+        return _io_executor
+
+
+def get_llm_executor():
+    """Process-wide, bounded pool for fan-out LLM work such as per-chunk generation.
+
+    Keeping it separate from the io pool stops one long video from starving searches and
+    follow-ups. The same rule applies: tasks must not call Streamlit APIs.
+    """
+    global _llm_executor
+    with _llm_executor_lock:
+        if _llm_executor is None:
+            _llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="llm")
+        return _llm_executor
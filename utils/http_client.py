@@ -0,0 +1,116 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (5, 60)
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Keep-alive connections kept open per host
+POOL_MAXSIZE = 32
+# Maximum concurrent in-flight requests per host across all sessions
+HOST_CONCURRENCY = {
+    "google.serper.dev": 16,
+    "api.groq.com": 16,
+}
+DEFAULT_HOST_CONCURRENCY = 8
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff, so sessions that failed together don't retry together"""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def retry_after_seconds(response):
+    """Seconds requested by a response's Retry-After header, capped at BACKOFF_MAX_SECONDS"""
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return min(float(value), BACKOFF_MAX_SECONDS)
+    except ValueError:
+        pass
+    try:
+        return min(max(parsedate_to_datetime(value).timestamp() - time.time(), 0), BACKOFF_MAX_SECONDS)
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpClient:
+    """Pooled keep-alive HTTP client with per-host concurrency limits and jittered retries"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES,
+                 host_concurrency=None, default_host_concurrency=DEFAULT_HOST_CONCURRENCY):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.host_concurrency = dict(HOST_CONCURRENCY, **(host_concurrency or {}))
+        self.default_host_concurrency = default_host_concurrency
+        self.retries = 0
+        self._host_semaphores = {}
+        self._lock = threading.Lock()
+
+        # A single session reuses TCP and TLS connections across every page and session
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=POOL_MAXSIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _host_semaphore(self, url):
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.host_concurrency.get(host, self.default_host_concurrency))
+                self._host_semaphores[host] = semaphore
+            return semaphore
+
+    def request(self, method, url, timeout=None, max_retries=None, **kwargs):
+        """Send a request, retrying connection errors, timeouts, 429 and 5xx responses"""
+        timeout = timeout or self.timeout
+        max_retries = self.max_retries if max_retries is None else max_retries
+        semaphore = self._host_semaphore(url)
+
+        for attempt in range(max_retries + 1):
+            try:
+                with semaphore:
+                    response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt == max_retries:
+                    return response
+                delay = retry_after_seconds(response) or backoff_delay(attempt)
+                response.close()
+
+            self.retries += 1
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Process-wide HTTP client shared by every page"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,217 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+from utils.http_client import RETRY_STATUS_CODES, backoff_delay, retry_after_seconds
+
+# Lower values are served first when requests queue for the same model
+INTERACTIVE = 0
+BATCH = 1
+
+# Requests per minute and burst size; per-model entries override the provider default
+PROVIDER_RATE_LIMITS = {
+    "groq": {"requests_per_minute": 30, "burst": 10},
+    "gemini": {"requests_per_minute": 15, "burst": 5},
+}
+MODEL_RATE_LIMITS = {
+    ("gemini", "gemini-1.5-pro"): {"requests_per_minute": 5, "burst": 2},
+}
+DEFAULT_RATE_LIMIT = {"requests_per_minute": 30, "burst": 5}
+
+MAX_RETRIES = 4
+# Give up rather than leave a page spinning behind a long queue
+QUEUE_TIMEOUT_SECONDS = 120
+LATENCY_SAMPLES = 200
+
+RETRYABLE_ERROR_NAMES = {
+    "APIConnectionError", "APITimeoutError", "ConnectionError", "Timeout",
+    "DeadlineExceeded", "ServiceUnavailable", "InternalServerError", "ResourceExhausted",
+}
+
+
+class QueueTimeout(Exception):
+    """Raised when a request waited longer than QUEUE_TIMEOUT_SECONDS for its rate-limit slot"""
+
+
+def error_status(error):
+    """HTTP status behind an SDK or requests exception, if it carries one"""
+    for attribute in ("status_code", "code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return int(value)
+    value = getattr(getattr(error, "response", None), "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(error):
+    status = error_status(error)
+    if status is not None:
+        return status in RETRY_STATUS_CODES
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+class TokenBucket:
+    """Token bucket whose waiters are served in priority order, then arrival order"""
+
+    def __init__(self, requests_per_minute, burst):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority=INTERACTIVE, timeout=QUEUE_TIMEOUT_SECONDS):
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    self._refill()
+                    at_head = self._waiting[0] == ticket
+                    if at_head and self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise QueueTimeout("The AI service is busy right now. Please try again shortly.")
+                    # Only the head waits on the clock; everyone else waits to become the head
+                    wait = (1 - self.tokens) / self.rate if at_head else remaining
+                    self._condition.wait(min(wait, remaining))
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+    def pause(self, seconds):
+        """Hold back every waiter for `seconds`, e.g. after the provider answered 429"""
+        with self._condition:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+    @property
+    def queue_depth(self):
+        return len(self._waiting)
+
+
+class _ModelMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.max_queue_depth = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+
+class LLMGateway:
+    """Single entry point for Groq and Gemini calls: per-model rate limits, priority queueing,
+    jittered retries and metrics shared by every page and session"""
+
+    def __init__(self, max_retries=MAX_RETRIES):
+        self.max_retries = max_retries
+        self._buckets = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, provider, model):
+        key = (provider, model)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                limits = MODEL_RATE_LIMITS.get(key) or PROVIDER_RATE_LIMITS.get(provider, DEFAULT_RATE_LIMIT)
+                bucket = self._buckets[key] = TokenBucket(limits["requests_per_minute"], limits["burst"])
+                self._metrics[key] = _ModelMetrics()
+            return bucket, self._metrics[key]
+
+    def call(self, provider, model, request, priority=INTERACTIVE):
+        """Run request() under the provider/model rate limit, retrying 429s, 5xx and connection errors.
+
+        request must not touch Streamlit if it may run off the script thread.
+        """
+        bucket, metrics = self._get(provider, model)
+
+        for attempt in range(self.max_retries + 1):
+            with self._lock:
+                metrics.max_queue_depth = max(metrics.max_queue_depth, bucket.queue_depth + 1)
+            bucket.acquire(priority)
+
+            started = time.monotonic()
+            try:
+                result = request()
+            except Exception as e:
+                status = error_status(e)
+                with self._lock:
+                    metrics.calls += 1
+                    if status == 429:
+                        metrics.rate_limited += 1
+                    if not is_retryable(e) or attempt == self.max_retries:
+                        metrics.errors += 1
+                        raise
+                    metrics.retries += 1
+
+                delay = retry_after_seconds(getattr(e, "response", None)) or backoff_delay(attempt)
+                if status == 429:
+                    # Slow every queued caller for this model, not just this one
+                    bucket.pause(delay)
+                time.sleep(delay)
+            else:
+                with self._lock:
+                    metrics.calls += 1
+                    metrics.latencies.append(time.monotonic() - started)
+                return result
+
+    def chat_completion(self, client, model, messages, priority=INTERACTIVE, **kwargs):
+        """client.chat.completions.create through the gateway (Groq SDK)"""
+        return self.call(
+            "groq", model,
+            lambda: client.chat.completions.create(model=model, messages=messages, **kwargs),
+            priority
+        )
+
+    def generate_content(self, model, contents, priority=INTERACTIVE, **kwargs):
+        """model.generate_content through the gateway (google.generativeai GenerativeModel)"""
+        model_name = getattr(model, "model_name", "gemini").split("/")[-1]
+        return self.call("gemini", model_name, lambda: model.generate_content(contents, **kwargs), priority)
+
+    def stats(self):
+        """Per provider/model metrics: calls, errors, retries, 429s, queue depth and latency"""
+        with self._lock:
+            items = list(self._metrics.items())
+            stats = {}
+            for (provider, model), metrics in items:
+                latencies = sorted(metrics.latencies)
+                stats[f"{provider}/{model}"] = {
+                    "calls": metrics.calls,
+                    "errors": metrics.errors,
+                    "retries": metrics.retries,
+                    "rate_limited": metrics.rate_limited,
+                    "queue_depth": self._buckets[(provider, model)].queue_depth,
+                    "max_queue_depth": metrics.max_queue_depth,
+                    "avg_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+                    "p95_latency": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+                }
+            return stats
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway():
+    """Process-wide LLM gateway shared by every page"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
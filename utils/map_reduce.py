@@ -0,0 +1,99 @@
+import hashlib
+import json
+from concurrent.futures import as_completed, wait
+
+# Parts combined per merge; bounds every merge prompt and gives log(n) merge depth
+MERGE_FAN_IN = 4
+
+
+def checkpoint_key(namespace, stage, inputs):
+    """Checkpoint key for one node: identical inputs always map to the same finished result"""
+    return hashlib.sha256(json.dumps([namespace, stage, inputs]).encode("utf-8")).hexdigest()
+
+
+def count_reduce_steps(count, fan_in=MERGE_FAN_IN):
+    """Number of merge calls needed to reduce `count` parts with the given fan-in"""
+    steps = 0
+    while count > 1:
+        steps += count // fan_in + (1 if count % fan_in > 1 else 0)
+        count = -(-count // fan_in)
+    return steps
+
+
+def _run_stage(executor, stage, groups, fn, checkpoint, namespace, report):
+    results = [None] * len(groups)
+    futures = {}
+    for i, group in enumerate(groups):
+        if stage != "map" and len(group) == 1:
+            # A lone trailing part moves up a level unchanged
+            results[i] = group[0]
+            continue
+
+        key = checkpoint_key(namespace, stage, group)
+        cached = checkpoint.get(key) if checkpoint is not None else None
+        if cached is not None:
+            results[i] = cached
+            report(stage)
+        else:
+            futures[executor.submit(fn, group)] = (i, key)
+
+    for future in as_completed(futures):
+        i, key = futures[future]
+        try:
+            results[i] = future.result()
+        except Exception:
+            _checkpoint_running(futures, checkpoint)
+            raise
+        if checkpoint is not None:
+            checkpoint.set(key, results[i])
+        report(stage)
+
+    return results
+
+
+def _checkpoint_running(futures, checkpoint):
+    """After a failure, cancel queued tasks but keep what running ones produce, so a retry reuses it"""
+    running = [future for future in futures if not future.cancel()]
+    if checkpoint is None:
+        return
+    # Running tasks cost model calls either way; wait for them rather than throwing their results away
+    wait(running)
+    for future in running:
+        if not future.cancelled() and future.exception() is None:
+            checkpoint.set(futures[future][1], future.result())
+
+
+def map_reduce(items, map_fn, reduce_fn, executor, fan_in=MERGE_FAN_IN, checkpoint=None,
+               namespace="", progress_callback=None):
+    """Map every item, then merge neighbouring results fan_in at a time until one is left.
+
+    Order is preserved at every level, so reduce_fn always receives parts in their original
+    sequence. Each finished node is checkpointed under a hash of its inputs, so rerunning after a
+    failure resumes from the last completed node instead of redoing the map stage.
+
+    Call from the script thread. map_fn(item) and reduce_fn(parts) run on the executor and must not
+    touch Streamlit. progress_callback(done, total, stage) is called here as nodes finish. The first
+    task error is raised once queued tasks are cancelled and running ones are checkpointed.
+    """
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+    if not items:
+        return None
+
+    total = len(items) + count_reduce_steps(len(items), fan_in)
+    done = 0
+
+    def report(stage):
+        nonlocal done
+        done += 1
+        if progress_callback:
+            progress_callback(done, total, stage)
+
+    level = _run_stage(executor, "map", [[item] for item in items], lambda group: map_fn(group[0]),
+                       checkpoint, namespace, report)
+    depth = 0
+    while len(level) > 1:
+        depth += 1
+        groups = [level[i:i + fan_in] for i in range(0, len(level), fan_in)]
+        level = _run_stage(executor, f"merge level {depth}", groups, reduce_fn, checkpoint, namespace, report)
+    return level[0]
@@ -0,0 +1,187 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+import multiprocessing
+
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+
+# Cache namespace for text produced by this module
+EXTRACTOR_NAME = "pdfminer"
+# Number of pages handed to a worker per task
+PAGES_PER_TASK = 8
+MAX_EXTRACTION_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+
+def create_extraction_executor(max_workers=MAX_EXTRACTION_WORKERS):
+    """Create a process pool for PDF extraction"""
+    # Spawn rather than fork: the Streamlit server is multi-threaded
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def count_pdf_pages(pdf_path):
+    """Count the pages of a PDF without extracting any text"""
+    with open(pdf_path, "rb") as fp:
+        return sum(1 for _ in PDFPage.get_pages(fp))
+
+
+def extract_page_range(pdf_path, page_numbers):
+    """Extract text from the given zero-based pages, keyed by one-based page number"""
+    page_numbers = sorted(page_numbers)
+    resource_manager = PDFResourceManager()
+    output = StringIO()
+    device = TextConverter(resource_manager, output, laparams=LAParams())
+    interpreter = PDFPageInterpreter(resource_manager, device)
+
+    pages = {}
+    try:
+        with open(pdf_path, "rb") as fp:
+            for page_number, page in zip(page_numbers, PDFPage.get_pages(fp, set(page_numbers))):
+                interpreter.process_page(page)
+                # TextConverter ends every page with a form feed
+                pages[page_number + 1] = output.getvalue().rstrip("\f")
+                output.seek(0)
+                output.truncate(0)
+    finally:
+        device.close()
+    return pages
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class PdfExtractionJob:
+    """Extracts a batch of PDFs in a process pool and exposes pages as they finish"""
+
+    def __init__(self, executor, uploads, cache=None, pages_per_task=PAGES_PER_TASK):
+        # uploads is a list of (filename, content_hash, pdf_bytes)
+        self.documents = []
+        self.started_at = time.monotonic()
+        self.cache = cache
+        self.executor = executor
+        self.pages_per_task = pages_per_task
+        self._futures = {}
+        self._page_counts = {}
+        self._remaining_ranges = {}
+        self._pending_tasks = {}
+        self._lock = threading.Lock()
+
+        for filename, content_hash, pdf_bytes in uploads:
+            document = {
+                "filename": filename,
+                "hash": content_hash,
+                "page_count": 0,
+                "pages": {},
+                "error": None,
+            }
+            self.documents.append(document)
+
+            cached = self.cache.get(content_hash, EXTRACTOR_NAME) if self.cache else None
+            if cached is not None:
+                document["page_count"] = len(cached["pages"])
+                document["pages"] = dict(enumerate(cached["pages"], start=1))
+                continue
+
+            # Workers read the file from disk instead of receiving a copy of the bytes per task
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+                tmp_file.write(pdf_bytes)
+
+            # Pages are counted in the pool too; page ranges are submitted once the count is in
+            self._page_counts[executor.submit(count_pdf_pages, tmp_file.name)] = (document, tmp_file.name)
+
+    def _submit_ranges(self, document, path):
+        ranges = [
+            list(range(start, min(start + self.pages_per_task, document["page_count"])))
+            for start in range(0, document["page_count"], self.pages_per_task)
+        ]
+        if not ranges:
+            _remove_file(path)
+            return
+
+        self._pending_tasks[path] = len(ranges)
+        self._remaining_ranges[id(document)] = len(ranges)
+        for page_numbers in ranges:
+            future = self.executor.submit(extract_page_range, path, page_numbers)
+            future.add_done_callback(lambda _, path=path: self._task_finished(path))
+            self._futures[future] = document
+
+    @property
+    def pages_total(self):
+        return sum(document["page_count"] for document in self.documents)
+
+    @property
+    def pages_done(self):
+        return sum(len(document["pages"]) for document in self.documents)
+
+    @property
+    def done(self):
+        return not self._futures and not self._page_counts
+
+    def pages_per_second(self):
+        elapsed = time.monotonic() - self.started_at
+        return self.pages_done / elapsed if elapsed > 0 else 0.0
+
+    def collect(self, progress_callback=None):
+        """Merge finished page ranges into their documents without blocking"""
+        for future in [f for f in self._page_counts if f.done()]:
+            document, path = self._page_counts.pop(future)
+            try:
+                document["page_count"] = future.result()
+            except Exception as e:
+                document["error"] = str(e)
+            self._submit_ranges(document, path)
+
+        for future in [f for f in self._futures if f.done()]:
+            document = self._futures.pop(future)
+            if future.cancelled():
+                continue
+            try:
+                document["pages"].update(future.result())
+            except Exception as e:
+                document["error"] = str(e)
+
+            self._remaining_ranges[id(document)] -= 1
+            if not self._remaining_ranges[id(document)] and not document["error"]:
+                self._store(document)
+
+        if progress_callback:
+            progress_callback(self.pages_done, self.pages_total, self.pages_per_second())
+        return self.documents
+
+    def _store(self, document):
+        if self.cache is None:
+            return
+        pages = [document["pages"].get(page_number, "") for page_number in range(1, document["page_count"] + 1)]
+        try:
+            self.cache.set(document["hash"], EXTRACTOR_NAME, pages)
+        except Exception:
+            # A cache failure should never fail the extraction itself
+            pass
+
+    def cancel(self):
+        """Drop queued page ranges; ranges already running finish in the background"""
+        for future, (_, path) in self._page_counts.items():
+            future.cancel()
+            _remove_file(path)
+        self._page_counts = {}
+        for future in list(self._futures):
+            future.cancel()
+        self._futures = {}
+
+    def _task_finished(self, path):
+        # Called from the executor once per page range, including cancelled ones
+        with self._lock:
+            self._pending_tasks[path] -= 1
+            if self._pending_tasks[path]:
+                return
+            del self._pending_tasks[path]
+        _remove_file(path)
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+PDF_TEXT_CACHE_PATH = Path("./pdf_text_cache") / "pages.sqlite3"
+PDF_TEXT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+def content_hash(pdf_bytes):
+    """SHA-256 of the raw file bytes, used as the cache address"""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class PdfTextCache:
+    """Size-bounded LRU store of extracted PDF pages, keyed by file content and extractor"""
+
+    def __init__(self, path=PDF_TEXT_CACHE_PATH, max_bytes=PDF_TEXT_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # One connection shared by every Streamlit session thread, guarded by the lock
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pdf_pages (
+                content_hash TEXT NOT NULL,
+                extractor TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (content_hash, extractor)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pdf_pages_last_access ON pdf_pages (last_access)")
+        self._conn.commit()
+
+    def get(self, pdf_hash, extractor):
+        """Return {'pages': [...], 'metadata': {...}} for a cached file, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM pdf_pages WHERE content_hash = ? AND extractor = ?",
+                (pdf_hash, extractor)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE pdf_pages SET last_access = ? WHERE content_hash = ? AND extractor = ?",
+                (time.time(), pdf_hash, extractor)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def set(self, pdf_hash, extractor, pages, metadata=None):
+        """Store the ordered page texts of a file, evicting least recently used entries"""
+        payload = zlib.compress(
+            json.dumps({"pages": list(pages), "metadata": metadata or {}}, ensure_ascii=False).encode("utf-8")
+        )
+        if len(payload) > self.max_bytes:
+            return False
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pdf_pages VALUES (?, ?, ?, ?, ?)",
+                (pdf_hash, extractor, payload, len(payload), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+        return True
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pdf_pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        to_free = total - self.max_bytes
+        stale = []
+        for pdf_hash, extractor, size in self._conn.execute(
+            "SELECT content_hash, extractor, size FROM pdf_pages ORDER BY last_access ASC"
+        ):
+            stale.append((pdf_hash, extractor))
+            to_free -= size
+            if to_free <= 0:
+                break
+        self._conn.executemany("DELETE FROM pdf_pages WHERE content_hash = ? AND extractor = ?", stale)
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pdf_pages"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_pdf_text_cache():
+    """Process-wide cache instance shared by every page"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PdfTextCache()
+        return _cache
@@ -0,0 +1,149 @@
+import argparse
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+RESPONSE_STORE_MAX_BYTES = 256 * 1024 * 1024
+RESPONSE_STORE_TTL_SECONDS = 30 * 24 * 60 * 60
+# Reads only refresh an entry's LRU timestamp when it is older than this
+ACCESS_TOUCH_SECONDS = 60
+# Eviction runs once every this many writes
+EVICTION_INTERVAL = 50
+
+
+class SQLiteResponseStore:
+    """Single-file key/value store for cached responses with TTL, LRU eviction and a byte cap"""
+
+    def __init__(self, path, max_bytes=RESPONSE_STORE_MAX_BYTES, ttl_seconds=RESPONSE_STORE_TTL_SECONDS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._writes = 0
+
+        conn = self._connection()
+        # WAL lets every session read while another one writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+        conn.commit()
+
+    def _connection(self):
+        # One connection per thread; Streamlit runs each session on its own thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, created_at, last_access FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, created_at, last_access = row
+        now = time.time()
+        if now - created_at > self.ttl_seconds:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+            return None
+
+        if now - last_access > ACCESS_TOUCH_SECONDS:
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return pickle.loads(value)
+
+    def set(self, key, value, created_at=None):
+        payload = pickle.dumps(value)
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+            (key, payload, len(payload), created_at or now, now)
+        )
+        conn.commit()
+
+        self._writes += 1
+        if self._writes % EVICTION_INTERVAL == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under the byte cap"""
+        conn = self._connection()
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            to_free = total - self.max_bytes
+            stale = []
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+                stale.append((key,))
+                to_free -= size
+                if to_free <= 0:
+                    break
+            conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        conn.commit()
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM responses")
+        conn.commit()
+
+    def stats(self):
+        entries, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return {"entries": entries, "bytes": total}
+
+
+def migrate_pickle_cache(store, cache_dir, remove=False):
+    """Import a directory of one-pickle-per-response files, using each file name as the key"""
+    migrated = 0
+    for cache_file in Path(cache_dir).glob("*.pkl"):
+        try:
+            with open(cache_file, "rb") as f:
+                value = pickle.load(f)
+        except Exception as e:
+            print(f"Skipping {cache_file.name}: {e}")
+            continue
+
+        store.set(cache_file.stem, value, created_at=cache_file.stat().st_mtime)
+        migrated += 1
+        if remove:
+            os.remove(cache_file)
+
+    store.evict()
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate a pickle-per-file response cache into a SQLite store")
+    parser.add_argument("cache_dir", help="Directory containing the .pkl cache files")
+    parser.add_argument("--db", help="SQLite file to write (default: <cache_dir>/responses.sqlite3)")
+    parser.add_argument("--remove", action="store_true", help="Delete each .pkl file once migrated")
+    args = parser.parse_args()
+
+    store = SQLiteResponseStore(args.db or Path(args.cache_dir) / "responses.sqlite3")
+    migrated = migrate_pickle_cache(store, args.cache_dir, remove=args.remove)
+    print(f"Migrated {migrated} cached responses into {store.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+from utils.http_client import get_http_client
+from utils.lru_cache import LRUCache
+from utils.response_store import SQLiteResponseStore
+
+SERPER_BASE_URL = "https://google.serper.dev"
+SEARCH_CACHE_PATH = Path("./search_cache") / "serper.sqlite3"
+SEARCH_CACHE_TTL_SECONDS = 12 * 60 * 60
+SEARCH_CACHE_MEMORY_ENTRIES = 2000
+SEARCH_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+
+def normalize_query(query):
+    return " ".join(str(query).lower().split())
+
+
+class SearchCache:
+    """Serper results cached in memory and in a local SQLite file, shared by every page"""
+
+    def __init__(self, path=SEARCH_CACHE_PATH, ttl_seconds=SEARCH_CACHE_TTL_SECONDS,
+                 memory_entries=SEARCH_CACHE_MEMORY_ENTRIES, max_bytes=SEARCH_CACHE_MAX_BYTES):
+        self.memory = LRUCache(memory_entries, ttl_seconds=ttl_seconds)
+        self.store = SQLiteResponseStore(path, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(endpoint, query, num=None, gl=None, hl=None):
+        parts = [endpoint, normalize_query(query), num, gl, hl]
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        result = self.memory.get(key)
+        if result is None:
+            result = self.store.get(key)
+            if result is not None:
+                self.memory.set(key, result)
+
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def set(self, key, result):
+        self.memory.set(key, result)
+        self.store.set(key, result)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    """Process-wide search cache shared by every page"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SearchCache()
+        return _cache
+
+
+def serper_search(endpoint, query, api_key, num=None, gl=None, hl=None):
+    """POST a query to a Serper endpoint ("search", "scholar", ...), serving repeats from the cache.
+
+    Raises on HTTP errors; failed responses are never cached.
+    """
+    cache = get_search_cache()
+    key = cache.make_key(endpoint, query, num, gl, hl)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    payload = {"q": query}
+    for name, value in (("num", num), ("gl", gl), ("hl", hl)):
+        if value is not None:
+            payload[name] = value
+
+    response = get_http_client().post(
+        f"{SERPER_BASE_URL}/{endpoint}",
+        headers={"X-API-KEY": api_key, "Content-Type": "application/json"},
+        json=payload
+    )
+    response.raise_for_status()
+    result = response.json()
+    cache.set(key, result)
+    return result
@@ -0,0 +1,85 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.completed = False
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution whose result every caller shares.
+
+    Works across Streamlit sessions because they run as threads of one process. Only the in-flight
+    call is shared; callers arriving after it finishes start a new one, so pair it with a cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) unless an identical call is in flight, in which case wait for its result"""
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._calls[key] = call
+                    self.executed += 1
+                else:
+                    self.coalesced += 1
+
+            if leader:
+                return self._run(key, call, fn, args, kwargs)
+
+            call.event.wait()
+            if call.completed:
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            # The leader was interrupted (e.g. its session reran) without a result; try again ourselves
+            with self._lock:
+                self.coalesced -= 1
+
+    def _run(self, key, call, fn, args, kwargs):
+        try:
+            call.result = fn(*args, **kwargs)
+            call.completed = True
+            return call.result
+        except Exception as e:
+            call.error = e
+            call.completed = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self):
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+                "coalesced_ratio": self.coalesced / total if total else 0.0,
+            }
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    """Process-wide single-flight group shared by every page and session"""
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight()
+        return _single_flight
@@ -0,0 +1,25 @@
+from functools import lru_cache
+
+import tiktoken
+
+# cl100k_base is the closest public tiktoken encoding to the Llama 3 and Gemini tokenizers
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name=DEFAULT_ENCODING):
+    """Load a tiktoken encoding once per process"""
+    return tiktoken.get_encoding(name)
+
+
+def encode(text, encoding_name=DEFAULT_ENCODING):
+    # Special-token text in documents is treated as plain text
+    return get_encoding(encoding_name).encode(text, disallowed_special=())
+
+
+def decode(tokens, encoding_name=DEFAULT_ENCODING):
+    return get_encoding(encoding_name).decode(tokens)
+
+
+def count_tokens(text, encoding_name=DEFAULT_ENCODING):
+    return len(encode(text, encoding_name))
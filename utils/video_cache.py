@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+from utils.lru_cache import LRUCache
+from utils.response_store import SQLiteResponseStore
+
+VIDEO_CACHE_PATH = Path("./edutube_cache") / "videos.sqlite3"
+VIDEO_CACHE_MAX_BYTES = 512 * 1024 * 1024
+VIDEO_CACHE_MEMORY_ENTRIES = 500
+
+# Captions and titles rarely change; generated artifacts are refreshed more often
+TRANSCRIPT_TTL_SECONDS = 30 * 24 * 60 * 60
+TITLE_TTL_SECONDS = 7 * 24 * 60 * 60
+ARTIFACT_TTL_SECONDS = 14 * 24 * 60 * 60
+# Intermediate map-reduce results only need to outlive a retry
+CHECKPOINT_TTL_SECONDS = 24 * 60 * 60
+
+CACHE_KINDS = ("transcript", "title", "artifact", "checkpoint")
+
+
+class VideoCache:
+    """Transcripts, titles, generated artifacts and map-reduce checkpoints per video, in memory and on disk.
+
+    Every entry carries its own expiry; the store's TTL is only an upper bound for cleanup.
+    """
+
+    def __init__(self, path=VIDEO_CACHE_PATH, max_bytes=VIDEO_CACHE_MAX_BYTES,
+                 memory_entries=VIDEO_CACHE_MEMORY_ENTRIES):
+        self.memory = LRUCache(memory_entries)
+        self.store = SQLiteResponseStore(
+            path, max_bytes=max_bytes,
+            ttl_seconds=max(TRANSCRIPT_TTL_SECONDS, TITLE_TTL_SECONDS, ARTIFACT_TTL_SECONDS)
+        )
+        self.counters = {kind: {"hits": 0, "misses": 0} for kind in CACHE_KINDS}
+        self._lock = threading.Lock()
+        self.checkpoints = _CheckpointView(self)
+
+    @staticmethod
+    def _key(kind, *parts):
+        return json.dumps([kind, *parts])
+
+    def _get(self, kind, key):
+        value = self.memory.get(key)
+        if value is None:
+            entry = self.store.get(key)
+            if entry is not None:
+                ttl_left = entry["expires_at"] - time.time()
+                if ttl_left > 0:
+                    value = entry["value"]
+                    self.memory.set(key, value, ttl_seconds=ttl_left)
+
+        with self._lock:
+            self.counters[kind]["hits" if value is not None else "misses"] += 1
+        return value
+
+    def _set(self, key, value, ttl_seconds):
+        self.memory.set(key, value, ttl_seconds=ttl_seconds)
+        self.store.set(key, {"value": value, "expires_at": time.time() + ttl_seconds})
+
+    def get_transcript(self, video_id):
+        return self._get("transcript", self._key("transcript", video_id))
+
+    def set_transcript(self, video_id, segments, ttl_seconds=TRANSCRIPT_TTL_SECONDS):
+        self._set(self._key("transcript", video_id), segments, ttl_seconds)
+
+    def get_title(self, video_id):
+        return self._get("title", self._key("title", video_id))
+
+    def set_title(self, video_id, title, ttl_seconds=TITLE_TTL_SECONDS):
+        self._set(self._key("title", video_id), title, ttl_seconds)
+
+    def get_artifact(self, video_id, output_type, detail_level, model_name):
+        return self._get("artifact", self._key("artifact", video_id, output_type, detail_level, model_name))
+
+    def set_artifact(self, video_id, output_type, detail_level, model_name, content,
+                     ttl_seconds=ARTIFACT_TTL_SECONDS):
+        self._set(self._key("artifact", video_id, output_type, detail_level, model_name), content, ttl_seconds)
+
+    def stats(self):
+        """Hit/miss counts and hit ratio per kind, plus the size of the disk store"""
+        with self._lock:
+            stats = {}
+            for kind, counts in self.counters.items():
+                lookups = counts["hits"] + counts["misses"]
+                stats[kind] = dict(counts, hit_ratio=counts["hits"] / lookups if lookups else 0.0)
+        stats.update(self.store.stats())
+        return stats
+
+
+class _CheckpointView:
+    """get/set interface over the video cache, used to checkpoint map-reduce nodes"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get(self, key):
+        return self.cache._get("checkpoint", self.cache._key("checkpoint", key))
+
+    def set(self, key, value):
+        self.cache._set(self.cache._key("checkpoint", key), value, CHECKPOINT_TTL_SECONDS)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_video_cache():
+    """Process-wide video cache shared by every session"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = VideoCache()
+        return _cache